@@ -0,0 +1,94 @@
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import json
+import os
+import sys
+
+from generate import *
+
+
+def main():
+
+    # Check usage
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    options = dict(
+        arg[2:].partition("=")[::2] for arg in sys.argv[1:]
+        if arg.startswith("--")
+    )
+    if (len(args) != 4 or not args[2].isdigit()
+            or any(o not in ["mac", "no-repeat", "images"] for o in options)
+            or options.get("images") == ""):
+        sys.exit("Usage: python batch.py [--mac] [--no-repeat] [--images=DIR] "
+                 "structure words count output.jsonl")
+
+    # Parse command-line arguments
+    structure = args[0]
+    words = args[1]
+    count = int(args[2])
+    output = args[3]
+    images = options.get("images")
+    if images:
+        os.makedirs(images, exist_ok=True)
+
+    # Generate fills, writing each as soon as it is found
+    creator = CrosswordCreator(Crossword(structure, words), mac="mac" in options)
+    exclude = set() if "no-repeat" in options else None
+    renderers = ProcessPoolExecutor() if images else None
+    rendering = []
+    written = 0
+    with open(output, "w") as f:
+        solutions = itertools.islice(creator.solutions(exclude), count)
+        for assignment in solutions:
+            f.write(json.dumps(fill_record(creator, written, assignment)) + "\n")
+            f.flush()
+            if exclude is not None:
+                exclude.update(assignment.values())
+            if renderers is not None:
+                filename = os.path.join(images, f"{written}.png")
+                rendering.append(renderers.submit(
+                    render, structure, words, assignment, filename
+                ))
+            written += 1
+
+    # Wait for images to be saved
+    if renderers is not None:
+        for future in rendering:
+            future.result()
+        renderers.shutdown()
+
+    print(f"Wrote {written} fills to {output}")
+
+
+def fill_record(creator, number, assignment):
+    """
+    Return a JSON-serializable record of one fill of a crossword.
+    """
+    return {
+        "number": number,
+        "words": [
+            {"i": var.i, "j": var.j, "direction": var.direction, "word": word}
+            for var, word in sorted(
+                assignment.items(),
+                key=lambda item: (item[0].i, item[0].j, item[0].direction)
+            )
+        ],
+        "grid": [
+            "".join(
+                (letter or " ") if creator.crossword.structure[i][j] else "#"
+                for j, letter in enumerate(row)
+            )
+            for i, row in enumerate(creator.letter_grid(assignment))
+        ]
+    }
+
+
+def render(structure, words, assignment, filename):
+    """
+    Save an image of a crossword fill; run in a separate worker process.
+    """
+    creator = CrosswordCreator(Crossword(structure, words))
+    creator.save(assignment, filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+
+from generate import *
+
+# Structures and word lists solved in every combination
+STRUCTURES = [f"data/structure{i}.txt" for i in range(3)]
+WORDS = [f"data/words{i}.txt" for i in range(3)]
+
+# Sizes of generated grids, solved with the largest word list
+GENERATED = [(7, 7), (9, 9), (11, 11), (13, 13)]
+GENERATED_WORDS = "data/words2.txt"
+
+# Words tried when laying out each generated grid
+PLACEMENT_ATTEMPTS = 2000
+
+# Seconds allowed for each solve before it is cancelled
+TIMEOUT = 30
+
+# Solver settings compared on each structure
+STRATEGIES = [
+    {"mac": False},
+    {"mac": True},
+    {"backjump": True},
+    {"mac": True, "decompose": True}
+]
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) not in [1, 2]:
+        sys.exit("Usage: python benchmark.py [report.json]")
+
+    runs = []
+    for structure in STRUCTURES:
+        for words in WORDS:
+            for strategy in STRATEGIES:
+                runs.append(run(structure, structure, words, strategy))
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        for height, width in GENERATED:
+            name = f"generated {height}x{width}"
+            structure = os.path.join(directory, f"{height}x{width}.txt")
+            with open(structure, "w") as f:
+                f.write(generate_structure(height, width, GENERATED_WORDS, rng))
+            for strategy in STRATEGIES:
+                runs.append(run(name, structure, GENERATED_WORDS, strategy))
+
+    report = json.dumps(runs, indent=4)
+    if len(sys.argv) == 2:
+        with open(sys.argv[1], "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+def run(name, structure, words, strategy):
+    """
+    Solve one structure with one word list and strategy, cancelling the
+    search after TIMEOUT seconds, and return a record of the result.
+    """
+    crossword = Crossword(structure, words)
+    stop = threading.Event()
+    timer = threading.Timer(TIMEOUT, stop.set)
+    creator = CrosswordCreator(crossword, stop=stop, **strategy)
+    timer.start()
+    try:
+        assignment = creator.solve()
+    finally:
+        timer.cancel()
+
+    if creator.cancelled:
+        status = "timeout"
+    else:
+        status = "solved" if assignment is not None else "no solution"
+    stats = dict(creator.stats)
+    stats["search_seconds"] = stats["seconds"] - stats["ac3_seconds"]
+    print(f"{name} / {words} / {strategy}: {status} "
+          f"in {stats['seconds']:.3f}s", file=sys.stderr)
+    return {
+        "structure": name,
+        "words": words,
+        "variables": len(crossword.variables),
+        "strategy": strategy,
+        "status": status,
+        "stats": stats
+    }
+
+
+def generate_structure(height, width, words, rng):
+    """
+    Return the text of a crossword structure of the given size that is
+    known to be fillable from the word list `words`: lay out distinct
+    words from the list crossing each other, as a constructor would, and
+    open exactly the cells they cover. Words are only placed where they
+    create no other run of open cells, so the structure's variables are
+    exactly the placed words.
+    """
+    vocabulary = sorted(
+        word for word in load_word_index(words).words
+        if 3 <= len(word) <= max(height, width)
+    )
+    letters = [[None] * width for _ in range(height)]
+
+    # Directions of the words covering each cell
+    covered = [[set() for _ in range(width)] for _ in range(height)]
+    placed = set()
+
+    def cell(i, j):
+        """Return the letter at (i, j), or None if blocked or off the grid."""
+        if 0 <= i < height and 0 <= j < width:
+            return letters[i][j]
+        return None
+
+    def fits(word, i, j, di, dj):
+        """Check whether `word` can be placed from (i, j) along (di, dj)."""
+        if cell(i - di, j - dj) or cell(i + len(word) * di, j + len(word) * dj):
+            return False
+        crossings = 0
+        for k, letter in enumerate(word):
+            y, x = i + k * di, j + k * dj
+            if not (0 <= y < height and 0 <= x < width):
+                return False
+            if letters[y][x] is None:
+                if cell(y - dj, x - di) or cell(y + dj, x + di):
+                    return False
+            elif letters[y][x] != letter or (di, dj) in covered[y][x]:
+                return False
+            else:
+                crossings += 1
+        return crossings < len(word)
+
+    def place(word, i, j, di, dj):
+        for k, letter in enumerate(word):
+            letters[i + k * di][j + k * dj] = letter
+            covered[i + k * di][j + k * dj].add((di, dj))
+        placed.add(word)
+
+    # Start with a word across the middle row
+    first = rng.choice([word for word in vocabulary if len(word) <= width])
+    place(first, height // 2, (width - len(first)) // 2, 0, 1)
+
+    # Cross open cells with further words wherever they fit
+    for _ in range(PLACEMENT_ATTEMPTS):
+        word = rng.choice(vocabulary)
+        if word in placed:
+            continue
+        di, dj = rng.choice([(0, 1), (1, 0)])
+        starts = [
+            (y - k * di, x - k * dj)
+            for y in range(height) for x in range(width)
+            for k, letter in enumerate(word) if letters[y][x] == letter
+        ]
+        rng.shuffle(starts)
+        for i, j in starts:
+            if fits(word, i, j, di, dj):
+                place(word, i, j, di, dj)
+                break
+
+    return "\n".join(
+        "".join("#" if letter is None else "_" for letter in row)
+        for row in letters
+    ) + "\n"
+
+
+if __name__ == "__main__":
+    main()
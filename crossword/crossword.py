@@ -1,3 +1,7 @@
+import os
+import sys
+
+
 class Variable():
 
     ACROSS = "across"
@@ -57,9 +61,12 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        # Save vocabulary, shared with other crosswords using the same file
+        self.index = load_word_index(words_file)
+        self.words = self.index.words
+        self.length_bits = self.index.length_bits
+        self.letter_bits = self.index.letter_bits
+        self.position_letters = self.index.position_letters
 
         # Determine variable set
         self.variables = set()
@@ -108,26 +115,137 @@ class Crossword():
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # Only overlapping pairs are stored; they are found by indexing
+        # which variables cover each cell
+        covering = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                covering.setdefault(cell, []).append((var, k))
+        self.overlaps = Overlaps()
+        for cell_vars in covering.values():
+            for v1, k1 in cell_vars:
+                for v2, k2 in cell_vars:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (k1, k2)
+
+        # Compute neighbors of each variable
+        self.neighbor_sets = {var: [] for var in self.variables}
+        for v1, v2 in self.overlaps:
+            self.neighbor_sets[v1].append(v2)
+        self.neighbor_sets = {
+            var: frozenset(neighbors)
+            for var, neighbors in self.neighbor_sets.items()
+        }
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.neighbor_sets[var]
+
+    def components(self):
+        """
+        Return list of sets of variables connected to each other by overlaps.
+        """
+        components = []
+        seen = set()
+        for var in self.variables:
+            if var in seen:
+                continue
+            component = {var}
+            frontier = [var]
+            while frontier:
+                for neighbor in self.neighbors(frontier.pop()):
+                    if neighbor not in component:
+                        component.add(neighbor)
+                        frontier.append(neighbor)
+            seen |= component
+            components.append(component)
+        return components
+
+    def words_in(self, length, bits):
+        """Given a bitset over words of `length`, return list of those words."""
+        return self.index.words_in(length, bits)
+
+    def word_bit(self, word):
+        """Given a word, return the bitset containing only that word."""
+        return 1 << self.index.numbers[word]
+
+
+class WordIndex():
+
+    def __init__(self, words_file):
+        """
+        Load a vocabulary, one word per line, into an index.
+        Words are interned and bucketed by length, and numbered within
+        their bucket, so that a bitset over a bucket represents a set of
+        words of that length. For each length and each (length, position,
+        letter) triple, a bitset records the words that match.
+        """
+        self.words = set()
+        buckets = dict()
+        with open(words_file) as f:
+            for line in f:
+                word = line.rstrip("\n").upper()
+                if word and word not in self.words:
+                    word = sys.intern(word)
+                    self.words.add(word)
+                    buckets.setdefault(len(word), []).append(word)
+
+        self.words_by_length = dict()
+        self.numbers = dict()
+        self.length_bits = dict()
+        self.letter_bits = dict()
+        self.position_letters = dict()
+        for length, bucket in sorted(buckets.items()):
+            bucket.sort()
+            self.words_by_length[length] = bucket
+            self.length_bits[length] = bitset(range(len(bucket)))
+            for k, word in enumerate(bucket):
+                self.numbers[word] = k
+            for position in range(length):
+                letters = dict()
+                for k, word in enumerate(bucket):
+                    letters.setdefault(word[position], []).append(k)
+                self.position_letters[length, position] = sorted(letters)
+                for letter, ks in letters.items():
+                    self.letter_bits[length, position, letter] = bitset(ks)
+
+    def words_in(self, length, bits):
+        """Given a bitset over words of `length`, return list of those words."""
+        bucket = self.words_by_length.get(length, [])
+        binary = bin(bits)[:1:-1]  # least significant bit first
+        words = []
+        k = binary.find("1")
+        while k != -1:
+            words.append(bucket[k])
+            k = binary.find("1", k + 1)
+        return words
+
+
+# Word indexes already loaded, by file path and modification time
+WORD_INDEXES = dict()
+
+
+def load_word_index(words_file):
+    """Return the index of the words in `words_file`, loading it only once."""
+    key = (os.path.abspath(words_file), os.path.getmtime(words_file))
+    if key not in WORD_INDEXES:
+        WORD_INDEXES[key] = WordIndex(words_file)
+    return WORD_INDEXES[key]
+
+
+class Overlaps(dict):
+    """Overlaps between pairs of variables; None for pairs not stored."""
+
+    def __missing__(self, key):
+        return None
+
+
+def bitset(numbers):
+    """Return an integer with the bits in `numbers` set."""
+    numbers = list(numbers)
+    if not numbers:
+        return 0
+    bits = bytearray(max(numbers) // 8 + 1)
+    for k in numbers:
+        bits[k >> 3] |= 1 << (k & 7)
+    return int.from_bytes(bits, "little")
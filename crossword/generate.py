@@ -1,21 +1,88 @@
-from queue import Queue
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import queue
+import random
 import sys
+import time
 
 from crossword import *
 
 
+# Largest number of nogoods recorded by backjumping search
+NOGOOD_LIMIT = 100000
+
+
 class CrosswordCreator():
 
-    def __init__(self, crossword):
+    def __init__(self, crossword, mac=False, backjump=False, decompose=False,
+                 seed=None, stop=None, variables=None):
         """
         Create new CSP crossword generate.
+        If `mac` is True, maintain arc consistency during backtracking.
+        If `backjump` is True, `backtrack` uses conflict-directed
+        backjumping and records failing partial assignments as nogoods.
+        If `decompose` is True, `solve` solves each connected component
+        of the crossword separately.
+        If `seed` is given, break ties in variable and value ordering
+        randomly using that seed. If `stop` is given, an event that
+        cancels the search once it is set.
+        If `variables` is given, only solve for that subset of variables.
         """
         self.crossword = crossword
+        self.variables = (
+            self.crossword.variables if variables is None else set(variables)
+        )
+        self.mac = mac
+        self.backjump = backjump
+        self.decompose = decompose
+        self.seed = seed
+        self.random = random.Random(seed) if seed is not None else None
+        self.stop = stop
+        self.cancelled = False
+
+        # Search statistics: nodes visited, values undone on backtrack,
+        # calls to revise, domains emptied by ac3, and seconds spent in
+        # ac3 and in the search as a whole
+        self.stats = {
+            "nodes": 0,
+            "backtracks": 0,
+            "revisions": 0,
+            "wipeouts": 0,
+            "backjumps": 0,
+            "nogood_hits": 0,
+            "ac3_seconds": 0.0,
+            "seconds": 0.0
+        }
+
+        # Each domain is a bitset over the words of the variable's length
+        # in `crossword.index`, so no vocabulary is copied
         self.domains = {
-            var: self.crossword.words.copy()
-            for var in self.crossword.variables
+            var: self.crossword.length_bits.get(var.length, 0)
+            for var in self.variables
         }
 
+        # Words used by the assignment being searched by `backtrack`, the
+        # variable using each of them in backjumping search, and words no
+        # assignment may use
+        self.used_words = set()
+        self.word_owners = dict()
+        self.excluded_words = set()
+
+        # Previous values of domains changed since search began, as
+        # (variable, domain) pairs, so that changes can be undone
+        self.trail = []
+
+        # Partial assignments known to have no solution, as frozensets of
+        # (variable, word) pairs, indexed by each pair they contain
+        self.nogoods = dict()
+        self.nogood_count = 0
+
+        # Letter counts for (variable, position) pairs, with the domain
+        # they were counted from, as filled in by `letter_counts`
+        self.count_tables = dict()
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -90,9 +157,97 @@ class CrosswordCreator():
         """
         Enforce node and arc consistency, and then solve the CSP.
         """
+        if self.decompose:
+            return self.solve_components()
+        start = time.perf_counter()
         self.enforce_node_consistency()
         self.ac3()
-        return self.backtrack(dict())
+        self.trail = []
+        assignment = self.backtrack(dict())
+        self.stats["seconds"] += time.perf_counter() - start
+        return assignment
+
+    def solve_components(self):
+        """
+        Solve each connected component of the crossword as a separate CSP,
+        in parallel where possible, and merge the solutions.
+        If a component uses a word another component already used, solve it
+        again without those words; if that fails, solve the whole crossword.
+        """
+        start = time.perf_counter()
+        components = [
+            component & self.variables
+            for component in self.crossword.components()
+            if component & self.variables
+        ]
+        options = {"mac": self.mac, "backjump": self.backjump, "seed": self.seed}
+        jobs = [(self.crossword, component, options) for component in components]
+        if len(jobs) > 1 and self.stop is None and (os.cpu_count() or 1) > 1:
+            with ProcessPoolExecutor() as executor:
+                results = list(executor.map(solve_component, *zip(*jobs)))
+        else:
+            results = [solve_component(*job, stop=self.stop) for job in jobs]
+
+        # A component with no solution leaves the crossword without one
+        assignment = None
+        if all(solution is not None for solution, _, _ in results):
+            assignment = dict()
+        for number, (solution, stats, cancelled) in enumerate(results):
+            self.add_stats(stats)
+            self.cancelled = self.cancelled or cancelled
+            if assignment is None:
+                continue
+
+            # Check for words used twice, merging as components are added
+            used = set(assignment.values())
+            if used.intersection(solution.values()):
+                solution, stats, cancelled = solve_component(
+                    *jobs[number], exclude=used, stop=self.stop
+                )
+                self.add_stats(stats)
+                self.cancelled = self.cancelled or cancelled
+            if solution is None:
+                if not self.cancelled:
+                    creator = CrosswordCreator(
+                        self.crossword, stop=self.stop,
+                        variables=self.variables, **options
+                    )
+                    assignment = creator.solve()
+                    self.add_stats(creator.stats)
+                    self.cancelled = creator.cancelled
+                else:
+                    assignment = None
+                break
+            assignment.update(solution)
+
+        self.stats["seconds"] = time.perf_counter() - start
+        return assignment
+
+    def add_stats(self, stats):
+        """
+        Add the search statistics in `stats` to this search's statistics.
+        """
+        for stat, value in stats.items():
+            self.stats[stat] += value
+
+    def solutions(self, exclude=None):
+        """
+        Enforce node and arc consistency, and then yield each solution to
+        the CSP in turn, as a new assignment.
+        If `exclude` is given, no solution uses any word in that set; words
+        added to it between solutions apply to the solutions that follow,
+        so search backs up past every variable holding one of them.
+        """
+        if exclude is not None:
+            self.excluded_words = exclude
+        self.enforce_node_consistency()
+        if not self.ac3():
+            return
+        self.trail = []
+        assignment = {v: None for v in self.variables}
+        self.used_words = set()
+        for solution in self.search(assignment):
+            yield dict(solution)
 
     def enforce_node_consistency(self):
         """
@@ -100,10 +255,10 @@ class CrosswordCreator():
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
-        for variable, domain in self.domains.items():
-            for x in domain.copy():
-                if len(x) != variable.length:
-                    self.domains[variable].remove(x)
+        for variable in self.domains:
+            self.domains[variable] &= self.crossword.length_bits.get(
+                variable.length, 0
+            )
 
     def revise(self, x, y):
         """
@@ -114,22 +269,38 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        revised = False
-        for wordX in self.domains[x].copy():
-            overlap = self.crossword.overlaps[x, y]
-            if overlap is not None:
-                # find wordY in Ydomain such that wordX[overlap.Xposition] == wordY[overlap.Yposition]
-                found = False
-                for wordY in self.domains[y]:
-                    if len(wordX) > overlap[0] and len(wordY) > overlap[1] and wordX[overlap[0]] == wordY[overlap[1]]:
-                        found = True
-                
-                if not found:
-                    self.domains[x].remove(wordX)
-                    revised = True
-        
-        return revised
-                
+        self.stats["revisions"] += 1
+        overlap = self.crossword.overlaps[x, y]
+        if overlap is None:
+            return False
+
+        # Keep words in x whose overlapping letter some word in y shares
+        letter_bits = self.crossword.letter_bits
+        supported = 0
+        for letter in self.crossword.position_letters.get((x.length, overlap[0]), []):
+            if self.domains[y] & letter_bits.get((y.length, overlap[1], letter), 0):
+                supported |= letter_bits[x.length, overlap[0], letter]
+
+        if not self.domains[x] & ~supported:
+            return False
+        self.set_domain(x, self.domains[x] & supported)
+        return True
+
+    def set_domain(self, var, domain):
+        """
+        Replace the domain of `var`, recording its old value on the trail.
+        """
+        self.trail.append((var, self.domains[var]))
+        self.domains[var] = domain
+
+    def undo(self, mark):
+        """
+        Restore domains changed since the trail had length `mark`.
+        """
+        while len(self.trail) > mark:
+            var, domain = self.trail.pop()
+            self.domains[var] = domain
+
     def ac3(self, arcs=None):
         """
         Update `self.domains` such that each variable is arc consistent.
@@ -139,24 +310,30 @@ class CrosswordCreator():
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
+        start = time.perf_counter()
         if arcs is None:
-            queue = Queue()
-            for v1 in self.crossword.variables:
+            queue = deque()
+            for v1 in self.variables:
                 for v2 in self.crossword.neighbors(v1):
                     if v1 != v2:
-                        queue.put((v1, v2))
+                        queue.append((v1, v2))
         else:
-            queue = arcs
-        
-        while not queue.empty():
-            X, Y = queue.get()
+            queue = deque(arcs)
+
+        consistent = True
+        while queue:
+            X, Y = queue.popleft()
             if self.revise(X, Y):
-                if len(self.domains[X]) == 0:
-                    return False
+                if not self.domains[X]:
+                    self.stats["wipeouts"] += 1
+                    consistent = False
+                    break
                 for Z in self.crossword.neighbors(X):
                     if Z != Y:
-                        queue.put((Z, X))
-        return True
+                        queue.append((Z, X))
+
+        self.stats["ac3_seconds"] += time.perf_counter() - start
+        return consistent
 
     def assignment_complete(self, assignment):
         """
@@ -204,12 +381,29 @@ class CrosswordCreator():
         count = 0
         for nb_var in self.crossword.neighbors(var):
             if nb_var not in already_assigned_vars:
-                overlap = self.crossword.overlaps[nb_var, var] 
-                for value in self.domains[nb_var]:
-                    if overlap is not None:  # value incompatible with selected_value:
-                        if value[overlap[0]] != selected_value[overlap[1]]:
-                            count += 1
+                overlap = self.crossword.overlaps[nb_var, var]
+                size, counts = self.letter_counts(nb_var, overlap[0])
+                count += size - counts.get(selected_value[overlap[1]], 0)
         return count
+
+    def letter_counts(self, var, position):
+        """
+        Return the size of the domain of `var`, and a mapping from each
+        letter to the number of words in the domain with that letter at
+        `position`. Counts are recomputed only when the domain has changed.
+        """
+        domain = self.domains[var]
+        table = self.count_tables.get((var, position))
+        if table is None or table[0] != domain:
+            letter_bits = self.crossword.letter_bits
+            counts = dict()
+            for letter in self.crossword.position_letters.get((var.length, position), []):
+                count = (domain & letter_bits[var.length, position, letter]).bit_count()
+                if count:
+                    counts[letter] = count
+            table = (domain, domain.bit_count(), counts)
+            self.count_tables[var, position] = table
+        return table[1], table[2]
     
     def order_domain_values(self, var, assignment):
         """
@@ -223,7 +417,9 @@ class CrosswordCreator():
             if value != None:
                 already_assigned_vars.add(variable)
 
-        domain_values = list(self.domains[var])
+        domain_values = self.crossword.words_in(var.length, self.domains[var])
+        if self.random is not None:
+            self.random.shuffle(domain_values)
         domain_values.sort(key=lambda x: self.number_of_values_ruled_out_for_neighboring_variables(var, x, already_assigned_vars))
         return domain_values
 
@@ -240,7 +436,9 @@ class CrosswordCreator():
             if word is None:
                 unassigned.append(var)
 
-        unassigned.sort(key=lambda v: (len(self.domains[v]), -len(self.crossword.neighbors(v))))
+        if self.random is not None:
+            self.random.shuffle(unassigned)
+        unassigned.sort(key=lambda v: (self.domains[v].bit_count(), -len(self.crossword.neighbors(v))))
         return unassigned[0]
 
     def backtrack(self, assignment):
@@ -253,55 +451,339 @@ class CrosswordCreator():
         If no assignment is possible, return None.
         """
         if len(assignment) == 0:  # initialize assignment with None
-            for v in self.crossword.variables:
+            for v in self.variables:
                 assignment[v] = None
+            self.used_words = set()
+            self.word_owners = dict()
+
+        if self.backjump:
+            return self.backjump_search(assignment)[0]
+        return next(self.search(assignment), None)
+
+    def search(self, assignment):
+        """
+        Using Backtracking Search, extend a partial assignment for the
+        crossword, yielding `assignment` each time it is complete.
+        The assignment is modified in place, so copy it to keep it.
+        """
+        self.stats["nodes"] += 1
+        if self.stop is not None and self.stop.is_set():
+            self.cancelled = True
+            return
 
         if self.assignment_complete(assignment):
-            return assignment
-        
+            yield assignment
+            return
+
         var = self.select_unassigned_variable(assignment)
         ordered = self.order_domain_values(var, assignment)
         for value in ordered:
             if self.is_value_consistent_with_assignment(var, value, assignment):
                 assignment[var] = value
-                result = self.backtrack(assignment)
-                if result is not None:
-                    return result
+                self.used_words.add(value)
+                mark = len(self.trail)
+                if not self.mac or self.maintain_arc_consistency(var, value, assignment):
+                    yield from self.search(assignment)
+                self.undo(mark)
+                self.stats["backtracks"] += 1
                 assignment[var] = None
+                self.used_words.remove(value)
+                if self.cancelled:
+                    return
 
+                # Words excluded since the last solution may still be held
+                # by earlier variables; back up until none are
+                if not self.used_words.isdisjoint(self.excluded_words):
+                    return
+
+    def backjump_search(self, assignment):
+        """
+        Using Backtracking Search with conflict-directed backjumping, extend
+        a partial assignment for the crossword.
+        Return the complete assignment and an empty set, or None and the
+        set of assigned variables responsible for the failure. When every
+        value of a variable fails, the words of the responsible variables
+        are recorded as a nogood, so that combination is never retried.
+        """
+        self.stats["nodes"] += 1
+        if self.stop is not None and self.stop.is_set():
+            self.cancelled = True
+            return None, set()
+
+        if self.assignment_complete(assignment):
+            return assignment, set()
+
+        var = self.select_unassigned_variable(assignment)
+
+        # With MAC, values missing from the domain may have been removed
+        # because of any assigned variable
+        consistent, conflicts = self.conflicting_variables(var, assignment)
+        if self.mac:
+            conflicts = {v for v, w in assignment.items() if w is not None}
+
+        for value in self.order_domain_values(var, assignment):
+            if not self.crossword.word_bit(value) & consistent:
+                continue
+
+            assignment[var] = value
+            self.used_words.add(value)
+            self.word_owners[value] = var
+            mark = len(self.trail)
+            failure = self.violated_nogood(var, value, assignment)
+            if failure is None:
+                if not self.mac or self.maintain_arc_consistency(var, value, assignment):
+                    result, failure = self.backjump_search(assignment)
+                    if result is not None:
+                        return result, set()
+                else:
+                    failure = {v for v, w in assignment.items() if w is not None}
+            self.undo(mark)
+            self.stats["backtracks"] += 1
+            assignment[var] = None
+            self.used_words.remove(value)
+            del self.word_owners[value]
+            if self.cancelled:
+                return None, set()
+
+            # If var played no part in the failure, no other value can help
+            if var not in failure:
+                self.stats["backjumps"] += 1
+                return None, failure
+            conflicts |= failure - {var}
+
+        self.record_nogood(conflicts, assignment)
+        return None, conflicts
+
+    def conflicting_variables(self, var, assignment):
+        """
+        Return the bitset of values in the domain of var that are
+        consistent with assignment, and the set of assigned variables
+        whose words rule out any of the others. Only var's neighbors and
+        the variables using words of var's length can be to blame; values
+        ruled out by excluded words have no one to blame.
+        """
+        letter_bits = self.crossword.letter_bits
+        domain = self.domains[var]
+        consistent = domain
+        culprits = set()
+        for nb_var in self.crossword.neighbors(var):
+            word = assignment.get(nb_var)
+            if word is not None:
+                overlap = self.crossword.overlaps[var, nb_var]
+                compatible = letter_bits.get(
+                    (var.length, overlap[0], word[overlap[1]]), 0
+                )
+                if domain & ~compatible:
+                    culprits.add(nb_var)
+                consistent &= compatible
+
+        for word, owner in self.word_owners.items():
+            if len(word) == var.length:
+                bit = self.crossword.word_bit(word)
+                if domain & bit:
+                    culprits.add(owner)
+                consistent &= ~bit
+        for word in self.excluded_words:
+            if len(word) == var.length:
+                consistent &= ~self.crossword.word_bit(word)
+        return consistent, culprits
+
+    def violated_nogood(self, var, value, assignment):
+        """
+        Return the variables of a recorded nogood that assignment contains
+        now that var is assigned value, or None if there is none.
+        """
+        for nogood in self.nogoods.get((var, value), []):
+            if all(assignment[v] == w for v, w in nogood):
+                self.stats["nogood_hits"] += 1
+                return {v for v, _ in nogood}
         return None
 
+    def record_nogood(self, variables, assignment):
+        """
+        Record the words assigned to `variables` as a nogood, unless
+        NOGOOD_LIMIT nogoods have been recorded already.
+        """
+        if self.nogood_count >= NOGOOD_LIMIT:
+            return
+        nogood = frozenset((v, assignment[v]) for v in variables)
+        for literal in nogood:
+            self.nogoods.setdefault(literal, []).append(nogood)
+        self.nogood_count += 1
+
+    def maintain_arc_consistency(self, var, value, assignment):
+        """
+        Reduce the domain of `var` to `value` and make its unassigned
+        neighbors arc consistent with it, recording changes on the trail.
+        Return False if some domain becomes empty.
+        """
+        self.set_domain(var, self.crossword.word_bit(value))
+        return self.ac3([
+            (nb_var, var) for nb_var in self.crossword.neighbors(var)
+            if assignment[nb_var] is None
+        ])
+
     def is_value_consistent_with_assignment(self, var, value, assignment):
         """
-        Checks if value for var is consistent with assignment
+        Checks if value for var is consistent with assignment.
+        The assignment is assumed to be consistent already, so only the
+        new value is checked: against the words in use and against the
+        words of var's assigned neighbors.
         """
-        aux_assignment = assignment.copy()
+        if (len(value) != var.length or value in self.used_words
+                or value in self.excluded_words):
+            return False
 
-        # remove unassigned vars
-        for v, w in assignment.items():
-            if w == None:
-                aux_assignment.pop(v)
+        for nb_var in self.crossword.neighbors(var):
+            word = assignment.get(nb_var)
+            if word is not None:
+                overlap = self.crossword.overlaps[var, nb_var]
+                if value[overlap[0]] != word[overlap[1]]:
+                    return False
 
-        aux_assignment[var] = value
+        return True
 
-        return self.consistent(aux_assignment)
+
+def solve_component(crossword, variables, options, exclude=None, stop=None):
+    """
+    Solve the part of `crossword` made up of `variables`, without using
+    any word in `exclude`. Return the assignment (or None), the search
+    statistics, and whether the search was cancelled.
+    """
+    creator = CrosswordCreator(crossword, variables=variables, stop=stop, **options)
+    if exclude is not None:
+        creator.excluded_words = set(exclude)
+    assignment = creator.solve()
+    return assignment, creator.stats, creator.cancelled
+
+
+# Number of strategies run by default in portfolio mode
+PORTFOLIO_SIZE = min(4, os.cpu_count() or 1)
+
+# Seconds to wait for a portfolio result before checking for dead workers
+RESULT_POLL = 1
+
+
+def portfolio_strategies(n):
+    """
+    Return `n` search strategies, as keyword arguments for CrosswordCreator:
+    the deterministic orderings with MAC, without it and with
+    backjumping, then MAC with
+    differently seeded tie-breaking.
+    """
+    strategies = [{"mac": True}, {"mac": False}, {"backjump": True}]
+    for seed in range(max(0, n - 3)):
+        strategies.append({"mac": True, "seed": seed})
+    return strategies[:n]
+
+
+def run_strategy(structure, words, strategy, number, stop, results):
+    """
+    Solve a crossword with one portfolio strategy, putting its number,
+    assignment and statistics on the `results` queue. Finishing the search
+    either way sets `stop`, since it settles the problem for every strategy.
+    """
+    try:
+        creator = CrosswordCreator(Crossword(structure, words), stop=stop, **strategy)
+        assignment = creator.solve()
+    except Exception as e:
+        results.put((number, None, failure(repr(e))))
+        return
+    stats = dict(creator.stats)
+    if creator.cancelled:
+        stats["status"] = "cancelled"
+    else:
+        stats["status"] = "solved" if assignment is not None else "no solution"
+        stop.set()
+    results.put((number, assignment, stats))
+
+
+def solve_portfolio(structure, words, strategies):
+    """
+    Solve a crossword by running each of `strategies` in its own process.
+    The first strategy to finish wins and the others are cancelled.
+    Return the assignment found (or None) and each strategy's statistics.
+    """
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=run_strategy,
+            args=(structure, words, strategy, number, stop, results)
+        )
+        for number, strategy in enumerate(strategies)
+    ]
+    for worker in workers:
+        worker.start()
+
+    assignment = None
+    reports = [None] * len(workers)
+    pending = set(range(len(workers)))
+    while pending:
+        try:
+            number, result, stats = results.get(timeout=RESULT_POLL)
+        except queue.Empty:
+
+            # A worker that died without reporting will never report
+            for number in list(pending):
+                exitcode = workers[number].exitcode
+                if exitcode is not None and exitcode != 0:
+                    pending.discard(number)
+                    reports[number] = failure(f"exit code {exitcode}")
+                    reports[number]["strategy"] = strategies[number]
+            continue
+        pending.discard(number)
+        stats["strategy"] = strategies[number]
+        reports[number] = stats
+        if assignment is None and result is not None:
+            assignment = result
+    for worker in workers:
+        worker.join()
+    return assignment, reports
+
+
+def failure(reason):
+    """Return the statistics reported for a strategy that failed."""
+    return {"status": f"failed ({reason})", "nodes": 0, "seconds": 0.0}
 
 
 def main():
 
     # Check usage
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Usage: python generate.py structure words [output]")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    if len(args) not in [2, 3] or any(
+        o not in ["--mac", "--backjump", "--components", "--portfolio", "--stats"]
+        for o in options
+    ) or ("--portfolio" in options and len(options) > 1):
+        sys.exit("Usage: python generate.py [--mac] [--backjump] [--components] "
+                 "[--stats] structure words [output]\n"
+                 "       python generate.py --portfolio structure words [output]")
 
     # Parse command-line arguments
-    structure = sys.argv[1]
-    words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
+    structure = args[0]
+    words = args[1]
+    output = args[2] if len(args) == 3 else None
 
     # Generate crossword
-    crossword = Crossword(structure, words)
-    creator = CrosswordCreator(crossword)
-    assignment = creator.solve()
+    if "--portfolio" in options:
+        strategies = portfolio_strategies(PORTFOLIO_SIZE)
+        assignment, reports = solve_portfolio(structure, words, strategies)
+        for stats in reports:
+            print(f"{stats['strategy']}: {stats['status']} after "
+                  f"{stats['nodes']} nodes in {stats['seconds']:.3f}s")
+
+        # Strategies solve in their own processes; this creator only prints
+        creator = CrosswordCreator(Crossword(structure, words))
+    else:
+        creator = CrosswordCreator(
+            Crossword(structure, words), mac="--mac" in options,
+            backjump="--backjump" in options, decompose="--components" in options
+        )
+        assignment = creator.solve()
+        if "--stats" in options:
+            for stat, value in creator.stats.items():
+                print(f"{stat}: {value}")
 
     # Print result
     if assignment is None:
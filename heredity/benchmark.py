@@ -0,0 +1,169 @@
+import cProfile
+import math
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+
+import heredity
+
+from functools import partial
+from pedigree import Pedigree
+
+# Families are generated for every combination of these sizes
+DEPTHS = [1, 2, 3, 4]
+WIDTHS = [2, 4, 6]
+
+# Largest family the exponential enumeration engines are run on
+ENUMERATION_LIMIT = 6
+
+# Largest difference from the reference marginals allowed for exact
+# engines, and for the sampling engine in standard errors of its estimates
+EXACT_TOLERANCE = 1e-9
+STANDARD_ERRORS = 5
+
+
+def main():
+
+    # Check for proper usage
+    args = sys.argv[1:]
+    profile = "--profile" in args
+    if profile:
+        args.remove("--profile")
+    if len(args) > 1 or (args and not args[0].isdigit()):
+        sys.exit("Usage: python benchmark.py [--profile] [seed]")
+    seed = int(args[0]) if args else 0
+    rng = random.Random(seed)
+
+    print(f"{'depth':>5} {'width':>5} {'people':>6} {'engine':<16}"
+          f"{'seconds':>10} {'peak KiB':>10} {'max error':>10}")
+    failures = 0
+    for depth in DEPTHS:
+        for width in WIDTHS:
+            people = generate_family(depth, width, rng)
+
+            # Check against exact enumeration where it is feasible
+            small = len(people) <= ENUMERATION_LIMIT
+            reference_engine = "log-enumeration" if small else "elimination"
+            reference = heredity.ENGINES[reference_engine](people)
+
+            seed = rng.randrange(2 ** 32)
+            for engine, infer in heredity.ENGINES.items():
+                if "enumeration" in engine and not small:
+                    continue
+                if engine == "sampling":
+                    infer = partial(infer, seed=seed)
+                    tolerance = sampling_tolerance(people, seed)
+                else:
+                    tolerance = EXACT_TOLERANCE
+                seconds, peak, probabilities = measure(infer, people)
+                if engine == reference_engine:
+                    error, status = "reference", ""
+                else:
+                    error = max_error(reference, probabilities)
+                    status = "" if error <= tolerance else "  FAIL"
+                    error = f"{error:.2e}"
+                failures += bool(status)
+                print(f"{depth:>5} {width:>5} {len(people):>6} {engine:<16}"
+                      f"{seconds:>10.4f} {peak / 1024:>10.1f} {error:>10}{status}")
+
+    if profile:
+        people = generate_family(DEPTHS[-1], WIDTHS[-1], rng)
+        heredity.FACTOR_CACHE.clear()
+        profiler = cProfile.Profile()
+        profiler.runcall(heredity.eliminate_probabilities, people)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+    if failures:
+        sys.exit(f"{failures} engine runs disagreed with the reference engine")
+
+
+def generate_family(depth, width, rng, evidence=0.5):
+    """
+    Return a synthetic family in the format returned by `heredity.load_data`,
+    with `width` founders and `depth` further generations of `width` people.
+    Each child's parents are drawn from the previous generation. Genes and
+    traits are sampled from `heredity.PROBS`, and each person's trait is
+    known with probability `evidence`.
+    """
+    people = dict()
+    genes = dict()
+    generation = []
+    for d in range(depth + 1):
+        previous = generation
+        generation = []
+        for i in range(width):
+            name = f"G{d}P{i}"
+            mother, father = (
+                rng.sample(previous, 2) if previous else (None, None)
+            )
+            if previous:
+                distribution = [
+                    heredity.inheritance(g, genes[mother], genes[father])
+                    for g in heredity.GENES
+                ]
+            else:
+                distribution = [heredity.PROBS["gene"][g] for g in heredity.GENES]
+            genes[name] = rng.choices(heredity.GENES, distribution)[0]
+            trait = rng.random() < heredity.PROBS["trait"][genes[name]][True]
+            if rng.random() >= evidence:
+                trait = None
+            people[name] = {
+                "name": name,
+                "mother": mother,
+                "father": father,
+                "traits": {"trait": trait},
+                "trait": trait
+            }
+            generation.append(name)
+    return people
+
+
+def measure(infer, people):
+    """
+    Run `infer` on `people` from an empty cache, returning the elapsed
+    time in seconds, peak memory in bytes, and the probabilities computed.
+    """
+    heredity.FACTOR_CACHE.clear()
+    start = time.perf_counter()
+    probabilities = infer(people)
+    seconds = time.perf_counter() - start
+
+    heredity.FACTOR_CACHE.clear()
+    tracemalloc.start()
+    infer(people)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, probabilities
+
+
+def sampling_tolerance(people, seed):
+    """
+    Return the largest error allowed for the sampling engine run with
+    `seed`: STANDARD_ERRORS times the largest standard error of a
+    probability estimated from the effective number of samples, given how
+    unevenly that run's samples are weighted.
+    """
+    _, weights = heredity.likelihood_weighting(
+        Pedigree.from_people(people), heredity.SAMPLES, random.Random(seed)
+    )
+    effective = 1 / sum(w * w for w in weights)
+    return STANDARD_ERRORS * math.sqrt(0.25 / effective)
+
+
+def max_error(expected, actual):
+    """
+    Return the largest absolute difference between two sets of
+    gene and trait distributions.
+    """
+    return max(
+        abs(expected[person][field][value] - actual[person][field][value])
+        for person in expected
+        for field in expected[person]
+        for value in expected[person][field]
+    )
+
+
+if __name__ == "__main__":
+    main()
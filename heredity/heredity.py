@@ -1,7 +1,15 @@
-import csv
 import itertools
+import json
+import math
+import random
 import sys
 
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from pedigree import Pedigree, load_pedigree
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,25 +44,79 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Possible number of copies of the gene a person can have
+GENES = (2, 1, 0)
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    engine = None
+    model = None
+    filenames = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("--engine="):
+            engine = arg[len("--engine="):]
+        elif arg.startswith("--model="):
+            try:
+                model = load_model(arg[len("--model="):])
+            except ValueError as e:
+                sys.exit(str(e))
+        else:
+            filenames.append(arg)
+    if model is not None and engine not in (None, "elimination"):
+        sys.exit("Models can only be evaluated with the elimination engine")
+    if not filenames or (engine is not None and engine not in ENGINES):
+        sys.exit("Usage: python heredity.py [--engine=ENGINE] [--model=model.json] data.csv ...\n"
+                 f"Engines: {', '.join(ENGINES)}")
+
+    for filename in filenames:
+        traits = ["trait"]
+        if model is not None:
+            traits = [trait for spec in model.values() for trait in spec["traits"]]
+        try:
+            pedigree = load_pedigree(filename, traits)
+        except ValueError as e:
+            sys.exit(str(e))
+        if model is not None:
+            probabilities = eliminate_probabilities(pedigree, model)
+        else:
+            probabilities = ENGINES[engine or "enumeration"](pedigree)
+
+        # Print results
+        if len(filenames) > 1:
+            print(f"{filename}:")
+        for person in probabilities:
+            print(f"{person}:")
+            for field in probabilities[person]:
+                print(f"  {field.capitalize()}:")
+                for value in probabilities[person][field]:
+                    p = probabilities[person][field][value]
+                    print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people, log_space=False):
+    """
+    Compute gene and trait distributions for each person by enumerating
+    every possible assignment of genes and traits.
+    If `log_space` is True, accumulate log probabilities instead, so that
+    large families do not underflow to zero before normalization.
+    """
+    if isinstance(people, Pedigree):
+        people = people.people()
+    zero = -math.inf if log_space else 0
 
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
             "gene": {
-                2: 0,
-                1: 0,
-                0: 0
+                2: zero,
+                1: zero,
+                0: zero
             },
             "trait": {
-                True: 0,
-                False: 0
+                True: zero,
+                False: zero
             }
         }
         for person in people
@@ -78,42 +140,35 @@ def main():
             for two_genes in powerset(names - one_gene):
 
                 # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+                if log_space:
+                    p = log_joint_probability(people, one_gene, two_genes, have_trait)
+                    log_update(probabilities, one_gene, two_genes, have_trait, p)
+                else:
+                    p = joint_probability(people, one_gene, two_genes, have_trait)
+                    update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
-    normalize(probabilities)
+    if log_space:
+        log_normalize(probabilities)
+    else:
+        normalize(probabilities)
+    return probabilities
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
 
-
-def load_data(filename):
+def load_data(filename, model=None):
     """
     Load gene and trait data from a file into a dictionary.
     File assumed to be a CSV containing fields name, mother, father, trait.
     mother, father must both be blank, or both be valid names in the CSV.
     trait should be 0 or 1 if trait is known, blank otherwise.
+    Any further columns are read as additional traits in the same way;
+    if `model` is given, the file must contain a column for each of its traits.
+    Raises ValueError if a parent is missing or someone is their own ancestor.
     """
-    data = dict()
-    with open(filename) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            name = row["name"]
-            data[name] = {
-                "name": name,
-                "mother": row["mother"] or None,
-                "father": row["father"] or None,
-                "trait": (True if row["trait"] == "1" else
-                          False if row["trait"] == "0" else None)
-            }
-    return data
+    traits = None
+    if model is not None:
+        traits = [trait for spec in model.values() for trait in spec["traits"]]
+    return load_pedigree(filename, traits).people()
 
 
 def powerset(s):
@@ -267,5 +322,495 @@ def normalize(probabilities):
         probabilities[person]["trait"][False] /= norm
 
 
+def log(p):
+    """
+    Return the natural logarithm of `p`, or -inf if `p` is zero.
+    """
+    return math.log(p) if p > 0 else -math.inf
+
+
+def logsumexp(values):
+    """
+    Return log(sum(exp(v) for v in values)) without underflow.
+    """
+    values = list(values)
+    top = max(values)
+    if top == -math.inf:
+        return top
+    return top + math.log(sum(math.exp(v - top) for v in values))
+
+
+def log_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    Compute and return the natural logarithm of `joint_probability`,
+    summing log factors rather than multiplying probabilities.
+    """
+    def genes(person):
+        return 1 if person in one_gene else 2 if person in two_genes else 0
+
+    lp = 0
+    for person in people:
+        num_genes = genes(person)
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None or father is None:  # person is a parent
+            lp += log(PROBS["gene"][num_genes])
+        else:  # person is a child
+            lp += log(inheritance(num_genes, genes(mother), genes(father)))
+        lp += log(PROBS["trait"][num_genes][person in have_trait])
+    return lp
+
+
+def log_update(probabilities, one_gene, two_genes, have_trait, lp):
+    """
+    Add to log-space `probabilities` a new log joint probability `lp`.
+    """
+    for person in probabilities:
+        num_genes = 1 if person in one_gene else 2 if person in two_genes else 0
+        has_trait = person in have_trait
+        gene = probabilities[person]["gene"]
+        trait = probabilities[person]["trait"]
+        gene[num_genes] = logsumexp([gene[num_genes], lp])
+        trait[has_trait] = logsumexp([trait[has_trait], lp])
+
+
+def log_normalize(probabilities):
+    """
+    Replace each log-space distribution in `probabilities` with the
+    normalized probability distribution it represents.
+    """
+    for person in probabilities:
+        for field in probabilities[person]:
+            distribution = probabilities[person][field]
+            norm = logsumexp(distribution.values())
+            for value in distribution:
+                distribution[value] = math.exp(distribution[value] - norm)
+
+
+# Number of compiled pedigrees kept by the elimination engine
+CACHE_SIZE = 128
+
+# Number of samples drawn by the sampling engine
+SAMPLES = 10000
+
+
+class FactorCache():
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        """
+        Create a least-recently-used cache of compiled pedigrees.
+        Elimination orders are keyed by pedigree topology alone, while
+        factor tables and marginals are keyed by topology, evidence and
+        a hash of `PROBS`.
+        """
+        self.maxsize = maxsize
+        self.plans = OrderedDict()
+        self.tables = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, entries, key):
+        """Return cached entry for `key`, or None, marking it recently used."""
+        if key not in entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entries.move_to_end(key)
+        return entries[key]
+
+    def store(self, entries, key, value):
+        """Add `value` to `entries` under `key`, evicting the oldest entry."""
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.plans.clear()
+        self.tables.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+FACTOR_CACHE = FactorCache()
+
+
+def probs_key(probs):
+    """
+    Return a hashable key identifying the contents of `probs`.
+    """
+    return json.dumps(probs, sort_keys=True)
+
+
+def default_model():
+    """
+    Return the model specification equivalent to `PROBS`: a single gene
+    named "gene" that determines a single trait named "trait".
+    """
+    return {
+        "gene": {
+            "gene": PROBS["gene"],
+            "mutation": PROBS["mutation"],
+            "traits": {"trait": PROBS["trait"]}
+        }
+    }
+
+
+def load_model(filename):
+    """
+    Load a model specification from a JSON file into a dictionary.
+    File assumed to map each gene name to an object with fields
+    "gene" (probability of each number of copies), "mutation", and
+    "traits", which maps each trait column in the family CSV to the
+    probability of having that trait given each number of copies.
+    """
+    with open(filename) as f:
+        contents = json.load(f)
+
+    model = dict()
+    for gene, spec in contents.items():
+        model[gene] = {
+            "gene": {int(g): p for g, p in spec["gene"].items()},
+            "mutation": spec["mutation"],
+            "traits": {
+                trait: {int(g): {True: p, False: 1 - p} for g, p in probs.items()}
+                for trait, probs in spec["traits"].items()
+            }
+        }
+        tables = [model[gene]["gene"]] + list(model[gene]["traits"].values())
+        if any(set(table) != set(GENES) for table in tables):
+            raise ValueError(f"gene {gene} must give probabilities for 0, 1 and 2 copies")
+    return model
+
+
+def compile_model(spec):
+    """
+    Compile one gene's specification into dense log-probability arrays,
+    indexed by number of copies: prior[g], transition[g][m][f] for a child
+    with g copies whose parents have m and f copies, and emission[k][g][t]
+    for the k-th trait of the gene.
+    """
+    return {
+        "prior": [log(spec["gene"][g]) for g in range(3)],
+        "transition": [
+            [
+                [log(inheritance(g, m, f, spec["mutation"])) for f in range(3)]
+                for m in range(3)
+            ]
+            for g in range(3)
+        ],
+        "emission": [
+            [
+                [log(probs[g][False]), log(probs[g][True])]
+                for g in range(3)
+            ]
+            for probs in spec["traits"].values()
+        ]
+    }
+
+
+def is_founder(parents):
+    """Return True if a person with `parents` has no modelled parents."""
+    return parents[0] is None or parents[1] is None
+
+
+def passes_gene(genes, mutation=None):
+    """
+    Return probability that a parent with `genes` copies passes the gene on.
+    """
+    if mutation is None:
+        mutation = PROBS["mutation"]
+    if genes == 1:
+        return 0.5
+    elif genes == 2:
+        return 1 - mutation
+    return mutation
+
+
+def inheritance(genes, mother_genes, father_genes, mutation=None):
+    """
+    Return probability that a child has `genes` copies given the number
+    of copies each parent has.
+    """
+    from_m = passes_gene(mother_genes, mutation)
+    from_f = passes_gene(father_genes, mutation)
+    if genes == 2:
+        return from_m * from_f
+    elif genes == 1:
+        return from_m * (1 - from_f) + from_f * (1 - from_m)
+    return (1 - from_m) * (1 - from_f)
+
+
+def local_factors(topology, evidence, tables):
+    """
+    Return one factor per person: the probability of their gene count
+    given their parents' gene counts, times the probability of their
+    observed traits, read from compiled `tables`. A factor is a
+    (variables, table) pair, where `table` maps a tuple of gene counts
+    for `variables` to a log probability.
+    """
+    prior = tables["prior"]
+    transition = tables["transition"]
+    emission = tables["emission"]
+
+    factors = []
+    for i, parents in enumerate(topology):
+        emit = [0, 0, 0]
+        for k, trait in enumerate(evidence[i]):
+            if trait is not None:
+                for g in range(3):
+                    emit[g] += emission[k][g][trait]
+        if is_founder(parents):
+            factors.append(((i,), {
+                (g,): prior[g] + emit[g]
+                for g in GENES
+            }))
+        else:
+            mother, father = parents
+            factors.append(((i, mother, father), {
+                (g, m, f): transition[g][m][f] + emit[g]
+                for g, m, f in itertools.product(GENES, repeat=3)
+            }))
+    return factors
+
+
+def elimination_order(topology, query):
+    """
+    Return an order in which to eliminate every person other than `query`,
+    greedily choosing the person with the fewest neighbours in the
+    moralized pedigree graph.
+    """
+    graph = {i: set() for i in range(len(topology))}
+    for i, parents in enumerate(topology):
+        if not is_founder(parents):
+            family = {i, *parents}
+            for j in family:
+                graph[j] |= family - {j}
+
+    order = []
+    remaining = set(graph) - {query}
+    while remaining:
+        person = min(remaining, key=lambda i: (len(graph[i]), i))
+        for neighbor in graph[person]:
+            graph[neighbor] |= graph[person] - {neighbor}
+            graph[neighbor].discard(person)
+        order.append(person)
+        remaining.remove(person)
+    return order
+
+
+def multiply(f1, f2):
+    """
+    Return the product of factors `f1` and `f2`.
+    """
+    variables = f1[0] + tuple(v for v in f2[0] if v not in f1[0])
+    pos1 = [variables.index(v) for v in f1[0]]
+    pos2 = [variables.index(v) for v in f2[0]]
+    table = dict()
+    for values in itertools.product(GENES, repeat=len(variables)):
+        table[values] = (f1[1][tuple(values[p] for p in pos1)] +
+                         f2[1][tuple(values[p] for p in pos2)])
+    return variables, table
+
+
+def sum_out(factor, variable):
+    """
+    Return `factor` with `variable` summed out.
+    """
+    variables, table = factor
+    k = variables.index(variable)
+    groups = dict()
+    for values, lp in table.items():
+        groups.setdefault(values[:k] + values[k + 1:], []).append(lp)
+    result = {key: logsumexp(lps) for key, lps in groups.items()}
+    return variables[:k] + variables[k + 1:], result
+
+
+def eliminate(factors, order):
+    """
+    Sum every variable in `order` out of the product of `factors`,
+    returning the single factor that remains.
+    """
+    factors = list(factors)
+    for variable in order:
+        related = [f for f in factors if variable in f[0]]
+        factors = [f for f in factors if variable not in f[0]]
+        product = related[0]
+        for factor in related[1:]:
+            product = multiply(product, factor)
+        factors.append(sum_out(product, variable))
+    result = factors[0]
+    for factor in factors[1:]:
+        result = multiply(result, factor)
+    return result
+
+
+def compile_pedigree(topology, evidence, spec, cache=FACTOR_CACHE):
+    """
+    Return the compiled form of a pedigree for one gene: an elimination
+    order for each person and the local factor tables, reusing any
+    cached parts.
+    """
+    plan = cache.lookup(cache.plans, topology)
+    if plan is None:
+        plan = cache.store(cache.plans, topology, [
+            elimination_order(topology, query)
+            for query in range(len(topology))
+        ])
+
+    key = (topology, evidence, probs_key(spec))
+    compiled = cache.lookup(cache.tables, key)
+    if compiled is None:
+        tables = compile_model(spec)
+        compiled = cache.store(cache.tables, key, {
+            "factors": local_factors(topology, evidence, tables),
+            "marginals": None
+        })
+    return plan, compiled
+
+
+def gene_marginals(plan, factors):
+    """
+    Return the gene distribution of each person, eliminating everyone
+    else from `factors` in the order given by `plan`.
+    """
+    marginals = []
+    for order in plan:
+        variables, table = eliminate(factors, order)
+        norm = logsumexp(table.values())
+        marginals.append({
+            g: math.exp(table[(g,)] - norm) for g in GENES
+        })
+    return marginals
+
+
+def eliminate_probabilities(people, model=None, cache=FACTOR_CACHE):
+    """
+    Compute gene and trait distributions for each person by variable
+    elimination over the pedigree, caching compiled pedigrees in `cache`.
+    Each gene in `model` (by default, `PROBS`) is evaluated independently,
+    in parallel when there is more than one to compute.
+    """
+    if not isinstance(people, Pedigree):
+        people = Pedigree.from_people(people)
+    if model is None:
+        model = default_model()
+    topology = people.topology()
+
+    # Compile each gene, collecting those whose marginals are not cached
+    compiled = dict()
+    pending = dict()
+    for gene, spec in model.items():
+        evidence = people.evidence(spec["traits"])
+        plan, compiled[gene] = compile_pedigree(topology, evidence, spec, cache)
+        if compiled[gene]["marginals"] is None:
+            pending[gene] = (plan, compiled[gene]["factors"])
+
+    if len(pending) > 1:
+        with ProcessPoolExecutor() as executor:
+            results = executor.map(gene_marginals, *zip(*pending.values()))
+            for gene, marginals in zip(pending, results):
+                compiled[gene]["marginals"] = marginals
+    else:
+        for gene, (plan, factors) in pending.items():
+            compiled[gene]["marginals"] = gene_marginals(plan, factors)
+
+    probabilities = {person: dict() for person in people.names}
+    for gene, spec in model.items():
+        for i, person in enumerate(people.names):
+            distribution = dict(compiled[gene]["marginals"][i])
+            probabilities[person][gene] = distribution
+            for trait, probs in spec["traits"].items():
+                observed = people.trait(trait, i)
+                if observed is None:
+                    probabilities[person][trait] = {
+                        t: sum(distribution[g] * probs[g][t] for g in GENES)
+                        for t in (True, False)
+                    }
+                else:
+                    probabilities[person][trait] = {
+                        t: float(t == observed) for t in (True, False)
+                    }
+    return probabilities
+
+
+def likelihood_weighting(people, samples, rng):
+    """
+    Sample `samples` gene assignments for a pedigree, parents before
+    children, and weight each by the probability of the observed traits.
+    Return the assignments and their weights, which sum to 1.
+    """
+    topology = people.topology()
+    traits = [people.trait("trait", i) for i in range(len(people))]
+    prior = [PROBS["gene"][g] for g in GENES]
+
+    weights = []
+    draws = []
+    for _ in range(samples):
+        genes = [0] * len(people)
+        weight = 0
+        for person in people.order:
+            if is_founder(topology[person]):
+                distribution = prior
+            else:
+                mother, father = topology[person]
+                distribution = [
+                    inheritance(g, genes[mother], genes[father]) for g in GENES
+                ]
+            genes[person] = rng.choices(GENES, distribution)[0]
+            if traits[person] is not None:
+                weight += log(PROBS["trait"][genes[person]][traits[person]])
+        weights.append(weight)
+        draws.append(genes)
+
+    # Rescale log weights before exponentiating to avoid underflow
+    top = max(weights)
+    weights = [math.exp(w - top) for w in weights]
+    total = sum(weights)
+    return draws, [w / total for w in weights]
+
+
+def sample_probabilities(people, samples=SAMPLES, seed=None):
+    """
+    Approximate gene and trait distributions for each person by likelihood
+    weighting: sample genes for parents before children, and weight each
+    sample by the probability of the observed traits.
+    """
+    if not isinstance(people, Pedigree):
+        people = Pedigree.from_people(people)
+    traits = [people.trait("trait", i) for i in range(len(people))]
+    draws, weights = likelihood_weighting(people, samples, random.Random(seed))
+
+    probabilities = {
+        person: {
+            "gene": {g: 0 for g in GENES},
+            "trait": {True: 0, False: 0}
+        }
+        for person in people.names
+    }
+    for weight, genes in zip(weights, draws):
+        for person, g in zip(people.names, genes):
+            probabilities[person]["gene"][g] += weight
+    for i, person in enumerate(people.names):
+        for t in (True, False):
+            if traits[i] is None:
+                probabilities[person]["trait"][t] = sum(
+                    probabilities[person]["gene"][g] * PROBS["trait"][g][t]
+                    for g in GENES
+                )
+            else:
+                probabilities[person]["trait"][t] = float(t == traits[i])
+    return probabilities
+
+
+ENGINES = {
+    "enumeration": enumerate_probabilities,
+    "log-enumeration": partial(enumerate_probabilities, log_space=True),
+    "elimination": eliminate_probabilities,
+    "sampling": sample_probabilities
+}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,202 @@
+import csv
+
+from array import array
+
+
+class Pedigree():
+
+    # Encoding of an unknown value in trait arrays
+    UNKNOWN = -1
+
+    def __init__(self, traits=("trait",)):
+        """
+        Create an empty pedigree that records the given trait columns.
+        People are numbered in the order they are added; `mothers` and
+        `fathers` hold each person's parent numbers (-1 for none), each
+        array in `traits` holds 1, 0 or UNKNOWN per person, and `order`
+        lists people so that parents come before their children.
+        """
+        self.names = []
+        self.index = dict()
+        self.mothers = array("i")
+        self.fathers = array("i")
+        self.traits = {trait: array("b") for trait in traits}
+        self.order = array("i")
+
+        # Parent references to names that have not been added yet
+        self.unresolved = dict()
+
+        # People not yet in `order`, by the names of parents they wait for
+        self.waiting = dict()
+        self.remaining = dict()
+        self.placed = set()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, mother, father, traits):
+        """
+        Add a person with parents `mother` and `father` (names, or None)
+        and a mapping from trait column to True, False or None.
+        Parents may be added after their children.
+        """
+        if name in self.index:
+            raise ValueError(f"{name} appears more than once")
+        if (mother is None) != (father is None):
+            raise ValueError(f"{name} must have both parents or neither")
+        if mother is not None and mother == father:
+            raise ValueError(f"{name} has the same mother and father")
+
+        person = len(self.names)
+        self.names.append(name)
+        self.index[name] = person
+        for trait, values in self.traits.items():
+            value = traits.get(trait)
+            values.append(Pedigree.UNKNOWN if value is None else int(value))
+
+        # Link parents, or remember to link them once they are added
+        for parents, parent in ((self.mothers, mother), (self.fathers, father)):
+            parents.append(self.index.get(parent, -1))
+            if parent is not None and parent not in self.index:
+                self.unresolved.setdefault(parent, []).append((parents, person))
+        for parents, child in self.unresolved.pop(name, []):
+            parents[child] = person
+
+        # Place person in topological order once both parents are placed
+        waiting_for = [
+            parent for parent in (mother, father)
+            if parent is not None and parent not in self.placed
+        ]
+        for parent in waiting_for:
+            self.waiting.setdefault(parent, []).append(person)
+        if waiting_for:
+            self.remaining[person] = len(waiting_for)
+        else:
+            self.place(person)
+
+    def place(self, person):
+        """
+        Append `person` to `order`, followed by any descendants that were
+        only waiting for them.
+        """
+        stack = [person]
+        while stack:
+            person = stack.pop()
+            self.order.append(person)
+            self.placed.add(self.names[person])
+            for child in self.waiting.pop(self.names[person], []):
+                self.remaining[child] -= 1
+                if self.remaining[child] == 0:
+                    del self.remaining[child]
+                    stack.append(child)
+
+    def finish(self):
+        """
+        Check that every parent refers to a person in the pedigree and that
+        nobody is their own ancestor, raising ValueError otherwise.
+        """
+        for parent, references in self.unresolved.items():
+            child = self.names[references[0][1]]
+            raise ValueError(f"{child} has parent {parent}, who is not listed")
+        if self.remaining:
+            names = ", ".join(sorted(self.names[p] for p in self.remaining))
+            raise ValueError(f"pedigree has a cycle involving {names}")
+        self.waiting = dict()
+        self.placed = set()
+        return self
+
+    def parents(self, person):
+        """Return (mother, father) numbers of `person`, or None if a founder."""
+        mother = self.mothers[person]
+        father = self.fathers[person]
+        return (None, None) if mother < 0 else (mother, father)
+
+    def trait(self, trait, person):
+        """Return the value of `trait` for `person`: True, False or None."""
+        value = self.traits[trait][person]
+        return None if value == Pedigree.UNKNOWN else bool(value)
+
+    def topology(self):
+        """
+        Return, for each person, the numbers of their mother and father.
+        """
+        return tuple(self.parents(person) for person in range(len(self)))
+
+    def evidence(self, traits):
+        """
+        Return, for each person, the value of each trait in `traits`.
+        """
+        return tuple(
+            tuple(self.trait(trait, person) for trait in traits)
+            for person in range(len(self))
+        )
+
+    def people(self):
+        """
+        Return the pedigree as a dictionary in the format of `load_data`.
+        """
+        data = dict()
+        for person, name in enumerate(self.names):
+            mother, father = self.parents(person)
+            data[name] = {
+                "name": name,
+                "mother": None if mother is None else self.names[mother],
+                "father": None if father is None else self.names[father],
+                "traits": {
+                    trait: self.trait(trait, person) for trait in self.traits
+                }
+            }
+            data[name]["trait"] = data[name]["traits"].get("trait")
+        return data
+
+    @classmethod
+    def from_people(cls, people):
+        """
+        Return a pedigree built from a dictionary in the format of `load_data`.
+        """
+        traits = set()
+        for person in people.values():
+            traits.update(person.get("traits", {"trait": None}))
+        pedigree = cls(sorted(traits))
+        for name, person in people.items():
+            pedigree.add(
+                name, person["mother"], person["father"],
+                person.get("traits", {"trait": person["trait"]})
+            )
+        return pedigree.finish()
+
+
+def load_pedigree(filename, traits=None):
+    """
+    Stream a family CSV, in the format read by `load_data`, into a pedigree.
+    File assumed to contain fields name, mother, father; every other column
+    is read as a trait. If `traits` is given, the file must contain each of
+    those columns.
+    """
+    with open(filename) as f:
+        reader = csv.DictReader(f)
+        columns = [
+            field for field in reader.fieldnames
+            if field not in ("name", "mother", "father")
+        ]
+        for trait in traits or []:
+            if trait not in columns:
+                raise ValueError(f"{filename} has no column for trait {trait}")
+
+        pedigree = Pedigree(columns)
+        for row in reader:
+            try:
+                pedigree.add(
+                    row["name"], row["mother"] or None, row["father"] or None,
+                    {
+                        trait: (True if row[trait] == "1" else
+                                False if row[trait] == "0" else None)
+                        for trait in columns
+                    }
+                )
+            except ValueError as e:
+                raise ValueError(f"{filename}, line {reader.line_num}: {e}")
+    try:
+        return pedigree.finish()
+    except ValueError as e:
+        raise ValueError(f"{filename}: {e}")
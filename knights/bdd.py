@@ -0,0 +1,148 @@
+class BDD():
+
+    # Nodes for the constant functions
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self, num_vars=0):
+        """
+        Create a manager for reduced ordered binary decision diagrams over
+        variables numbered by level from 0, tested in that order. Nodes are
+        integers; each node other than FALSE and TRUE tests the variable at
+        `level[node]` and continues to `low[node]` if it is false and to
+        `high[node]` if it is true. No two nodes are equal as functions.
+        """
+        self.num_vars = num_vars
+        self.level = [num_vars, num_vars]
+        self.low = [None, None]
+        self.high = [None, None]
+
+        # Node for each (level, low, high) triple, and results of `ite`
+        self.unique = dict()
+        self.computed = dict()
+
+    def __len__(self):
+        return len(self.level)
+
+    def add_var(self):
+        """Add a variable below all existing ones and return its level."""
+        self.num_vars += 1
+        self.level[BDD.FALSE] = self.level[BDD.TRUE] = self.num_vars
+        return self.num_vars - 1
+
+    def node(self, level, low, high):
+        """Return the node testing `level` with the given children."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = self.unique[key] = len(self.level)
+            self.level.append(level)
+            self.low.append(low)
+            self.high.append(high)
+        return node
+
+    def variable(self, level):
+        """Return the node that is true exactly when variable `level` is."""
+        return self.node(level, BDD.FALSE, BDD.TRUE)
+
+    def ite(self, f, g, h):
+        """Return the node for "if f then g else h"."""
+        if f == BDD.TRUE:
+            return g
+        if f == BDD.FALSE:
+            return h
+        if g == h:
+            return g
+        if g == BDD.TRUE and h == BDD.FALSE:
+            return f
+        key = (f, g, h)
+        result = self.computed.get(key)
+        if result is None:
+            top = min(self.level[f], self.level[g], self.level[h])
+            f0, f1 = self.cofactors(f, top)
+            g0, g1 = self.cofactors(g, top)
+            h0, h1 = self.cofactors(h, top)
+            result = self.computed[key] = self.node(
+                top, self.ite(f0, g0, h0), self.ite(f1, g1, h1)
+            )
+        return result
+
+    def cofactors(self, f, level):
+        """Return `f` with variable `level` set false, and set true."""
+        if self.level[f] != level:
+            return f, f
+        return self.low[f], self.high[f]
+
+    def negate(self, f):
+        return self.ite(f, BDD.FALSE, BDD.TRUE)
+
+    def conjoin(self, f, g):
+        return self.ite(f, g, BDD.FALSE)
+
+    def disjoin(self, f, g):
+        return self.ite(f, BDD.TRUE, g)
+
+    def implies(self, f, g):
+        return self.ite(f, g, BDD.TRUE)
+
+    def equivalent(self, f, g):
+        return self.ite(f, g, self.negate(g))
+
+    def restrict(self, f, assignment):
+        """
+        Return `f` with each variable in `assignment` (a dictionary from
+        level to True or False) fixed to its value, in time linear in the
+        size of `f`.
+        """
+        memo = dict()
+
+        def walk(u):
+            if u <= BDD.TRUE:
+                return u
+            if u not in memo:
+                level = self.level[u]
+                if level in assignment:
+                    memo[u] = walk(self.high[u] if assignment[level] else self.low[u])
+                else:
+                    memo[u] = self.node(level, walk(self.low[u]), walk(self.high[u]))
+            return memo[u]
+
+        return walk(f)
+
+    def count(self, f, num_vars=None):
+        """
+        Return the number of assignments to the first `num_vars` variables
+        (all of them by default) that make `f` true, in time linear in the
+        size of `f`. `f` must only test variables among those.
+        """
+        if num_vars is None:
+            num_vars = self.num_vars
+        memo = {BDD.FALSE: 0, BDD.TRUE: 1}
+
+        def level(u):
+            return num_vars if u <= BDD.TRUE else self.level[u]
+
+        def walk(u):
+            if u not in memo:
+                low, high = self.low[u], self.high[u]
+                memo[u] = (
+                    (walk(low) << (level(low) - self.level[u] - 1))
+                    + (walk(high) << (level(high) - self.level[u] - 1))
+                )
+            return memo[u]
+
+        return walk(f) << level(f)
+
+    def size(self, f):
+        """Return the number of nodes reachable from `f`."""
+        seen = set()
+        stack = [f]
+        while stack:
+            u = stack.pop()
+            if u not in seen:
+                seen.add(u)
+                if u > BDD.TRUE:
+                    stack.extend([self.low[u], self.high[u]])
+        return len(seen)
@@ -0,0 +1,197 @@
+import cProfile
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+
+import logic
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+from sat import Solver
+
+# Numbers of speakers in generated knights-and-knaves puzzles, and how
+# deeply their statements nest
+SPEAKERS = [2, 3, 4, 6, 8, 12]
+STATEMENT_DEPTH = 3
+
+# Numbers of variables in random 3-SAT instances, and clauses per variable
+# (near the hardest ratio for random 3-SAT)
+VARIABLES = [10, 14, 18, 30, 60, 100]
+CLAUSE_RATIO = 4.26
+
+# Largest number of symbols each engine is run on; engines not listed run
+# on every instance
+SYMBOL_LIMITS = {
+    "model_check": 14,
+    "compiled": 18,
+    "vectorized": 22,
+    "parallel": 16,
+    "obdd": 40
+}
+
+
+def main():
+
+    # Check for proper usage
+    args = sys.argv[1:]
+    profile = "--profile" in args
+    if profile:
+        args.remove("--profile")
+    if len(args) > 1 or (args and not args[0].isdigit()):
+        sys.exit("Usage: python benchmark.py [--profile] [seed]")
+    seed = int(args[0]) if args else 0
+    rng = random.Random(seed)
+
+    instances = [
+        (f"puzzle {n}", generate_puzzle(n, STATEMENT_DEPTH, rng))
+        for n in SPEAKERS
+    ] + [
+        (f"3-SAT {n}", generate_3sat(n, round(CLAUSE_RATIO * n), rng))
+        for n in VARIABLES
+    ]
+
+    print(f"{'instance':<12} {'symbols':>7} {'engine':<12}"
+          f"{'seconds':>10} {'peak KiB':>10} {'entailed':>9}")
+    failures = 0
+    for name, knowledge in instances:
+        queries = [Symbol(symbol) for symbol in sorted(knowledge.symbols())]
+        engines = [
+            engine for engine in logic.ENGINES
+            if len(queries) <= SYMBOL_LIMITS.get(engine, len(queries))
+        ]
+        reference = None
+        for engine in engines:
+            try:
+                seconds, peak, entailed = measure(engine, knowledge, queries)
+            except ImportError as e:
+                print(f"{name:<12} {len(queries):>7} {engine:<12}  skipped: {e}")
+                continue
+            if reference is None:
+                reference = entailed
+                checked = check_models(knowledge, queries, entailed)
+                if checked is None:
+                    status = "  unchecked" if len(engines) == 1 else ""
+                else:
+                    status = "" if checked else "  FAIL"
+            else:
+                status = "" if entailed == reference else "  FAIL"
+            failures += status == "  FAIL"
+            print(f"{name:<12} {len(queries):>7} {engine:<12}"
+                  f"{seconds:>10.4f} {peak / 1024:>10.1f} {len(entailed):>9}{status}")
+
+    if profile:
+        name, knowledge = instances[-1]
+        queries = [Symbol(symbol) for symbol in sorted(knowledge.symbols())]
+        logic.clear_caches()
+        profiler = cProfile.Profile()
+        profiler.runcall(logic.entailed, knowledge, queries, "cdcl")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+    if failures:
+        sys.exit(f"{failures} engine runs failed their checks")
+
+
+def generate_puzzle(n, depth, rng):
+    """
+    Return the knowledge base of a knights-and-knaves puzzle with `n`
+    speakers, each of whom is a knight or a knave and makes one statement
+    about the others, nested up to `depth` levels, in the style of
+    `puzzle.py`.
+    """
+    knights = [Symbol(f"P{i} is a Knight") for i in range(n)]
+    knaves = [Symbol(f"P{i} is a Knave") for i in range(n)]
+
+    def says(i, statement):
+        return And(
+            Implication(knights[i], statement),
+            Implication(knaves[i], Not(statement))
+        )
+
+    def statement(depth):
+        kind = rng.choice(["claim", "not", "and", "or", "same", "says"])
+        if depth == 0 or kind == "claim":
+            return rng.choice(knights + knaves)
+        if kind == "not":
+            return Not(statement(depth - 1))
+        if kind == "and":
+            return And(statement(depth - 1), statement(depth - 1))
+        if kind == "or":
+            return Or(statement(depth - 1), statement(depth - 1))
+        if kind == "same":
+            return Biconditional(statement(depth - 1), statement(depth - 1))
+        return says(rng.randrange(n), statement(depth - 1))
+
+    conjuncts = []
+    for i in range(n):
+        conjuncts.append(Or(knights[i], knaves[i]))
+        conjuncts.append(Not(And(knights[i], knaves[i])))
+    for i in range(n):
+        conjuncts.append(says(i, statement(depth)))
+    return And(*conjuncts)
+
+
+def generate_3sat(n, m, rng):
+    """
+    Return a random 3-SAT instance over `n` symbols with `m` clauses, each
+    of three distinct symbols negated at random, as a sentence.
+    """
+    symbols = [Symbol(f"x{i}") for i in range(n)]
+    return And(*[
+        Or(*[
+            symbol if rng.random() < 0.5 else Not(symbol)
+            for symbol in rng.sample(symbols, 3)
+        ])
+        for _ in range(m)
+    ])
+
+
+def check_models(knowledge, queries, entailed):
+    """
+    Check the queries an engine says knowledge base entails without another
+    engine to compare against: for each symbol in `queries` that is not
+    entailed, find a model of knowledge base where it is false, and check
+    by evaluating the sentences that each model satisfies knowledge base
+    and every entailed query. Return None if knowledge base has no model to
+    check against.
+    """
+    compiled = logic.cnf(knowledge)
+    numbering = {name: n for n, name in enumerate(compiled.symbols, 1)}
+    solver = Solver(compiled.clauses)
+    solver.new_var(compiled.num_vars)
+    if not solver.add_clause([compiled.root]) or not solver.solve():
+        return None
+
+    for query in queries:
+        if query in entailed:
+            continue
+        if not solver.solve([-numbering[query.name]]):
+            return False
+        model = {name: solver.model[n] for name, n in numbering.items()}
+        if not knowledge.evaluate(model) or query.evaluate(model) or not all(
+            sentence.evaluate(model) for sentence in entailed
+        ):
+            return False
+    return True
+
+
+def measure(engine, knowledge, queries):
+    """
+    Ask `engine` which of `queries` knowledge base entails, from empty
+    caches, returning the elapsed time in seconds, peak memory in bytes
+    (of this process only), and the entailed queries.
+    """
+    logic.clear_caches()
+    start = time.perf_counter()
+    entailed = logic.entailed(knowledge, queries, engine)
+    seconds = time.perf_counter() - start
+
+    logic.clear_caches()
+    tracemalloc.start()
+    logic.entailed(knowledge, queries, engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, entailed
+
+
+if __name__ == "__main__":
+    main()
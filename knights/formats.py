@@ -0,0 +1,226 @@
+import re
+
+from logic import *
+
+# Operators, by the text that may be written for them; `formula()` writes
+# the first of each
+OPERATORS = {
+    "¬": "not", "~": "not",
+    "∧": "and", "&": "and",
+    "∨": "or", "|": "or",
+    "=>": "implies",
+    "<=>": "iff",
+    "(": "(", ")": ")"
+}
+TOKENS = re.compile("(" + "|".join(
+    re.escape(op) for op in sorted(OPERATORS, key=len, reverse=True)
+) + ")")
+
+
+# How tightly each operator binds, and the sentence each one builds
+PRECEDENCE = {"not": 4, "and": 3, "or": 2, "implies": 1, "iff": 0}
+CONNECTIVES = {
+    "and": And, "or": Or, "implies": Implication, "iff": Biconditional
+}
+
+
+def parse(text):
+    """
+    Parse a sentence written in the syntax of `formula()`: symbol names
+    joined by ¬, ∧, ∨, => and <=>, from tightest to loosest binding, with
+    parentheses for grouping. => groups to the right. Symbol names are
+    any other text, with surrounding spaces removed. Raises ValueError if
+    `text` is not a sentence.
+    """
+    # Parsed sentences, and pending operators with how many operands each
+    # has so far, so that a chain of ∧ or ∨ becomes a single sentence
+    operands = []
+    operators = []
+
+    def reduce():
+        kind, arity = operators.pop()
+        if kind == "not":
+            operands.append(Not(operands.pop()))
+        else:
+            arguments = operands[-arity:]
+            del operands[-arity:]
+            operands.append(CONNECTIVES[kind](*arguments))
+
+    expect_operand = True
+    for piece in TOKENS.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        kind = OPERATORS.get(piece, "symbol")
+        if expect_operand:
+            if kind == "symbol":
+                operands.append(Symbol(piece))
+                expect_operand = False
+            elif kind in ("not", "("):
+                operators.append([kind, 1])
+            else:
+                raise ValueError(f"expected symbol, found {piece}")
+        elif kind == ")":
+            while operators and operators[-1][0] != "(":
+                reduce()
+            if not operators:
+                raise ValueError("found ) without matching (")
+            operators.pop()
+        elif kind in CONNECTIVES:
+            precedence = PRECEDENCE[kind]
+            while operators and operators[-1][0] != "(" and (
+                PRECEDENCE[operators[-1][0]] > precedence
+                or operators[-1][0] == kind == "iff"
+            ):
+                reduce()
+            if operators and operators[-1][0] == kind and kind in ("and", "or"):
+                operators[-1][1] += 1
+            else:
+                operators.append([kind, 2])
+            expect_operand = True
+        else:
+            raise ValueError(f"expected operator, found {piece}")
+
+    if expect_operand:
+        raise ValueError("expected symbol, found end of text")
+    while operators:
+        if operators[-1][0] == "(":
+            raise ValueError("expected ), found end of text")
+        reduce()
+    return operands[0]
+
+
+def read_sentences(lines, filename="<text>"):
+    """
+    Yield the sentence on each line of `lines` in turn, skipping blank
+    lines and lines starting with #.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            yield parse(line)
+        except ValueError as e:
+            raise ValueError(f"{filename}, line {number}: {e}")
+
+
+def load_knowledge(filename):
+    """
+    Stream a file of sentences, one per line in the syntax of `parse`,
+    into a knowledge base: the conjunction of all of them.
+    """
+    with open(filename, encoding="utf-8") as f:
+        return And(*read_sentences(f, filename))
+
+
+def save_knowledge(knowledge, filename):
+    """
+    Write a knowledge base to a file that `load_knowledge` reads, one
+    conjunct per line.
+    """
+    conjuncts = (knowledge.conjuncts if isinstance(knowledge, And)
+                 else [knowledge])
+    with open(filename, "w", encoding="utf-8") as f:
+        for conjunct in conjuncts:
+            f.write(conjunct.formula() + "\n")
+
+
+def is_literal(sentence):
+    return isinstance(sentence, Symbol) or (
+        isinstance(sentence, Not) and isinstance(sentence.operand, Symbol)
+    )
+
+
+def clauses_of(knowledge):
+    """
+    Return the clauses of knowledge base as lists of literal sentences if
+    it is already a conjunction of disjunctions of literals, or None.
+    """
+    conjuncts = (knowledge.conjuncts if isinstance(knowledge, And)
+                 else [knowledge])
+    clauses = []
+    for conjunct in conjuncts:
+        literals = (conjunct.disjuncts if isinstance(conjunct, Or)
+                    else [conjunct])
+        if not all(is_literal(literal) for literal in literals):
+            return None
+        clauses.append(literals)
+    return clauses
+
+
+def save_dimacs(knowledge, filename):
+    """
+    Write knowledge base in DIMACS CNF format. A knowledge base already in
+    CNF is written clause for clause; any other is written as its Tseitin
+    compilation, which is satisfiable exactly when knowledge base is.
+    Comment lines `c var N NAME` record the symbol each variable stands
+    for, and auxiliary variables are named _N.
+    """
+    clauses = clauses_of(knowledge)
+    if clauses is not None:
+        names = sorted(knowledge.symbols())
+        numbering = {name: n for n, name in enumerate(names, 1)}
+        clauses = [
+            [numbering[literal.name] if isinstance(literal, Symbol)
+             else -numbering[literal.operand.name] for literal in clause]
+            for clause in clauses
+        ]
+    else:
+        compiled = cnf(knowledge)
+        names = compiled.symbols + [
+            f"_{n}" for n in range(len(compiled.symbols) + 1, compiled.num_vars + 1)
+        ]
+        clauses = compiled.clauses + [[compiled.root]]
+
+    with open(filename, "w", encoding="utf-8") as f:
+        for n, name in enumerate(names, 1):
+            f.write(f"c var {n} {name}\n")
+        f.write(f"p cnf {len(names)} {len(clauses)}\n")
+        for clause in clauses:
+            f.write(" ".join(str(literal) for literal in clause) + " 0\n")
+
+
+def load_dimacs(filename):
+    """
+    Stream a DIMACS CNF file into a knowledge base of clauses. Variables
+    are named by `c var N NAME` comments where present, and xN otherwise.
+    Reading stops at a `%` line, which ends SATLIB benchmark files.
+    """
+    names = dict()
+    clauses = []
+    literals = []
+
+    # Sentence for each literal, built the first time it is read
+    sentences = dict()
+
+    def literal(n):
+        if n not in sentences:
+            symbol = Symbol(names.setdefault(abs(n), f"x{abs(n)}"))
+            sentences[n] = symbol if n > 0 else Not(symbol)
+        return sentences[n]
+
+    with open(filename, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if line.startswith("c"):
+                fields = line.split(maxsplit=3)
+                if len(fields) == 4 and fields[1] == "var" and fields[2].isdigit():
+                    names[int(fields[2])] = fields[3].strip()
+                continue
+            if line.startswith("%"):
+                break
+            if line.startswith("p"):
+                continue
+            try:
+                values = [int(field) for field in line.split()]
+            except ValueError:
+                raise ValueError(f"{filename}, line {number}: invalid literal")
+            for n in values:
+                if n == 0:
+                    clauses.append(Or(*literals))
+                    literals = []
+                else:
+                    literals.append(literal(n))
+    if literals:
+        clauses.append(Or(*literals))
+    return And(*clauses)
@@ -1,10 +1,127 @@
 import itertools
+import multiprocessing
+import weakref
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bdd import BDD
+from sat import Solver
 
 
 class Sentence():
 
-    def evaluate(self, model):
-        """Evaluates the logical sentence."""
+    # Each distinct sentence without a conjunction in it is constructed
+    # once, so structurally identical ones are the same object and compare
+    # equal by identity. A conjunction can grow, so conjunctions and the
+    # sentences containing them are never shared; they have no key, compare
+    # equal by their operands, and recompute their cached hash and symbols
+    # once any conjunction has grown since (a new generation)
+    __slots__ = (
+        "key", "hash", "symbol_set", "stamp", "shared", "cnf_cache",
+        "__weakref__"
+    )
+    interned = weakref.WeakValueDictionary()
+    generation = 0
+
+    @classmethod
+    def intern(cls, *arguments):
+        """
+        Return the sentence of this class with these operands, creating it
+        only if it does not exist yet. Operands are interned themselves, so
+        they are identified by their ids; if one can grow, so can the new
+        sentence, which is not interned.
+        """
+        for argument in arguments:
+            if argument.key is None:
+                return cls.create(None, arguments)
+        return cls.lookup((cls,) + tuple(map(id, arguments)), arguments)
+
+    @classmethod
+    def lookup(cls, key, arguments):
+        """
+        Return the interned sentence for `key`, creating it from
+        `arguments` if there is none.
+        """
+        sentence = Sentence.interned.get(key)
+        if sentence is None:
+            sentence = Sentence.interned[key] = cls.create(key, arguments)
+        else:
+            sentence.shared = True
+        return sentence
+
+    @classmethod
+    def create(cls, key, arguments):
+        """
+        Returns a new sentence for `key`, or one that can grow if `key` is
+        None, without interning it.
+        """
+        sentence = object.__new__(cls)
+        sentence.setup(*arguments)
+        sentence.shared = False
+        sentence.cnf_cache = None
+        sentence.rehash(key)
+        return sentence
+
+    def setup(self, *arguments):
+        """Stores the arguments the sentence was constructed with."""
+        pass
+
+    def rehash(self, key):
+        """Caches the hash and symbols of the sentence."""
+        self.key = key
+        operands = self.operands()
+        if key is None:
+            self.stamp = Sentence.generation
+            key = (type(self),) + tuple(map(hash, operands))
+        self.hash = hash(key)
+        if len(operands) == 1:
+            self.symbol_set = operands[0].symbol_set
+        else:
+            self.symbol_set = frozenset().union(
+                *[operand.symbol_set for operand in operands]
+            )
+
+    def __eq__(self, other):
+        if not isinstance(other, Sentence):
+            return NotImplemented
+        if self is other:
+            return True
+        if self.key is not None or other.key is not None:
+            return False
+        return (
+            type(self) is type(other) and hash(self) == hash(other)
+            and list(self.operands()) == list(other.operands())
+        )
+
+    def __hash__(self):
+        if self.key is None and self.stamp != Sentence.generation:
+            self.rehash(None)
+        return self.hash
+
+    def __reduce__(self):
+        return (type(self), tuple(self.operands()))
+
+    def operands(self):
+        """Returns the sentences this sentence is built from."""
+        return ()
+
+    def evaluate(self, model, memo=None):
+        """
+        Evaluates the logical sentence, evaluating each subsentence that
+        was constructed more than once only once for the model.
+        """
+        if memo is None:
+            memo = dict()
+        if not self.shared:
+            return self.compute(model, memo)
+        value = memo.get(id(self))
+        if value is None:
+            value = memo[id(self)] = self.compute(model, memo)
+        return value
+
+    def compute(self, model, memo):
+        """Evaluates the logical sentence, given memoized subsentences."""
         raise Exception("nothing to evaluate")
 
     def formula(self):
@@ -13,7 +130,8 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        hash(self)
+        return set(self.symbol_set)
 
     @classmethod
     def validate(cls, sentence):
@@ -43,20 +161,25 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
+    def __new__(cls, name):
+        return cls.lookup((cls, name), (name,))
+
+    def setup(self, name):
         self.name = name
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    def rehash(self, key):
+        super().rehash(key)
+        self.symbol_set = frozenset([self.name])
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __repr__(self):
         return self.name
 
-    def evaluate(self, model):
+    def evaluate(self, model, memo=None):
         try:
             return bool(model[self.name])
         except KeyError:
@@ -65,47 +188,43 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return cls.intern(operand)
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    def setup(self, operand):
+        self.operand = operand
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def operands(self):
+        return (self.operand,)
 
     def __repr__(self):
         return f"Not({self.operand})"
 
-    def evaluate(self, model):
-        return not self.operand.evaluate(model)
+    def compute(self, model, memo):
+        return not self.operand.evaluate(model, memo)
 
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
+        return cls.create(None, conjuncts)
+
+    def setup(self, *conjuncts):
         self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def operands(self):
+        return self.conjuncts
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,11 +233,17 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        """
+        Adds a conjunct in place, for growing a knowledge base. Sentences
+        containing this conjunction see the change, and recompute their
+        hashes and symbols when next asked for them.
+        """
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        Sentence.generation += 1
 
-    def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+    def compute(self, model, memo):
+        return all(conjunct.evaluate(model, memo) for conjunct in self.conjuncts)
 
     def formula(self):
         if len(self.conjuncts) == 1:
@@ -126,30 +251,27 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
+        return cls.intern(*disjuncts)
+
+    def setup(self, *disjuncts):
         self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def operands(self):
+        return self.disjuncts
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
-    def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+    def compute(self, model, memo):
+        return any(disjunct.evaluate(model, memo) for disjunct in self.disjuncts)
 
     def formula(self):
         if len(self.disjuncts) == 1:
@@ -157,73 +279,62 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
+        return cls.intern(antecedent, consequent)
+
+    def setup(self, antecedent, consequent):
         self.antecedent = antecedent
         self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def operands(self):
+        return (self.antecedent, self.consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
-    def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+    def compute(self, model, memo):
+        return ((not self.antecedent.evaluate(model, memo))
+                or self.consequent.evaluate(model, memo))
 
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
+        return cls.intern(left, right)
+
+    def setup(self, left, right):
         self.left = left
         self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def operands(self):
+        return (self.left, self.right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
-    def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+    def compute(self, model, memo):
+        return (self.left.evaluate(model, memo)
+                == self.right.evaluate(model, memo))
 
     def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
+        left = Sentence.parenthesize(self.left.formula())
+        right = Sentence.parenthesize(self.right.formula())
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
@@ -261,3 +372,551 @@ def model_check(knowledge, query):
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Compile `sentence` into a Python function of one bit-packed model: an
+    integer whose bit i is the value of symbols[i]. The function runs
+    straight-line code with no recursion or dictionary lookups and returns
+    1 or 0. It also accepts a NumPy array of unsigned integer models,
+    returning an array of results, one for each model.
+    """
+    slots = {symbol: i for i, symbol in enumerate(symbols)}
+    lines = []
+    names = dict()
+
+    def emit(sentence):
+        """Return the local variable holding the value of `sentence`."""
+        if sentence in names:
+            return names[sentence]
+        if isinstance(sentence, Symbol):
+            expression = f"m >> {slots[sentence.name]} & 1"
+        elif isinstance(sentence, Not):
+            expression = f"1 ^ {emit(sentence.operand)}"
+        elif isinstance(sentence, And):
+            expression = " & ".join(emit(c) for c in sentence.conjuncts) or "1"
+        elif isinstance(sentence, Or):
+            expression = " | ".join(emit(d) for d in sentence.disjuncts) or "0"
+        elif isinstance(sentence, Implication):
+            antecedent = emit(sentence.antecedent)
+            expression = f"(1 ^ {antecedent}) | {emit(sentence.consequent)}"
+        elif isinstance(sentence, Biconditional):
+            left = emit(sentence.left)
+            expression = f"1 ^ {left} ^ {emit(sentence.right)}"
+        else:
+            raise TypeError("must be a logical sentence")
+        names[sentence] = f"t{len(names)}"
+        lines.append(f"    {names[sentence]} = {expression}")
+        return names[sentence]
+
+    result = emit(sentence)
+    source = "def evaluate(m):\n" + "\n".join(lines) + f"\n    return {result}\n"
+    namespace = dict()
+    exec(compile(source, "<sentence>", "exec"), namespace)
+    return namespace["evaluate"]
+
+
+def compiled_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, by running the compiled
+    implication from knowledge base to query on every bit-packed model.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    check = compile_sentence(Implication(knowledge, query), symbols)
+    return all(map(check, range(2 ** len(symbols))))
+
+
+# Number of models evaluated at once by `vectorized_check`
+VECTOR_SIZE = 1 << 16
+
+
+def vectorized_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, by running the compiled
+    implication on NumPy vectors of VECTOR_SIZE models at a time.
+    """
+    import numpy as np
+
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    if len(symbols) >= 64:
+        raise ValueError("too many symbols to pack into 64-bit models")
+    check = compile_sentence(Implication(knowledge, query), symbols)
+    total = 2 ** len(symbols)
+    for start in range(0, total, VECTOR_SIZE):
+        models = np.arange(start, min(start + VECTOR_SIZE, total), dtype=np.uint64)
+        if not np.all(check(models)):
+            return False
+    return True
+
+
+# Symbols fixed in each cube by `parallel_check`, giving 2 ** CUBE_SYMBOLS cubes
+CUBE_SYMBOLS = 6
+
+# Models a worker checks between looks at whether to stop
+POLL_INTERVAL = 1 << 12
+
+# Compiled implication, symbol count, and stop event of a worker process
+WORKER = dict()
+
+
+def parallel_check(knowledge, query, cube_symbols=CUBE_SYMBOLS, workers=None):
+    """
+    Checks if knowledge base entails query, by fixing the first
+    `cube_symbols` symbols to each of their combinations and checking the
+    resulting cubes of models in a pool of `workers` processes. Once any
+    worker finds a counter-model, the others stop.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    k = min(cube_symbols, len(symbols))
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(workers, initializer=start_worker, initargs=(
+        Implication(knowledge, query), symbols, k, stop
+    )) as pool:
+        futures = [pool.submit(check_cube, cube) for cube in range(2 ** k)]
+        try:
+            for future in as_completed(futures):
+                if not future.result():
+                    stop.set()
+                    return False
+        finally:
+            for future in futures:
+                future.cancel()
+    return True
+
+
+def start_worker(implication, symbols, k, stop):
+    """Compile the implication to check in a worker process."""
+    WORKER["check"] = compile_sentence(implication, symbols)
+    WORKER["total"] = 2 ** len(symbols)
+    WORKER["step"] = 2 ** k
+    WORKER["stop"] = stop
+
+
+def check_cube(cube):
+    """
+    Check the implication in every model whose first symbols are set as
+    in the bits of `cube`, returning False at a counter-model. Returns True
+    early if another worker has found one.
+    """
+    check, total, step = WORKER["check"], WORKER["total"], WORKER["step"]
+    chunk = step * POLL_INTERVAL
+    for start in range(cube, total, chunk):
+        if WORKER["stop"].is_set():
+            return True
+        if not all(map(check, range(start, min(start + chunk, total), step))):
+            return False
+    return True
+
+
+class CNF():
+
+    def __init__(self, sentence):
+        """
+        Compile `sentence` into an equisatisfiable list of clauses by the
+        Tseitin transformation: each connective gets a new variable defined
+        to be equivalent to it, so the clauses grow linearly with the
+        sentence. Literals are integers as in DIMACS; symbols are numbered
+        from 1 in sorted order, followed by the new variables, and `root`
+        is the literal equivalent to the whole sentence.
+        """
+        self.symbols = sorted(sentence.symbols())
+        self.num_vars = len(self.symbols)
+        self.numbering = {
+            symbol: n for n, symbol in enumerate(self.symbols, 1)
+        }
+        self.clauses = []
+
+        # Literals of subsentences already encoded, so shared ones are reused
+        self.literals = dict()
+        self.root = self.encode(sentence)
+
+    def encode(self, sentence):
+        """Return the literal equivalent to `sentence`, adding clauses."""
+        if isinstance(sentence, Symbol):
+            return self.numbering[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.encode(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, And):
+            operands = [self.encode(c) for c in sentence.conjuncts]
+        elif isinstance(sentence, Or):
+            operands = [self.encode(d) for d in sentence.disjuncts]
+        elif isinstance(sentence, Implication):
+            operands = [self.encode(sentence.antecedent),
+                        self.encode(sentence.consequent)]
+        elif isinstance(sentence, Biconditional):
+            operands = [self.encode(sentence.left),
+                        self.encode(sentence.right)]
+        else:
+            raise TypeError("must be a logical sentence")
+        if len(operands) == 1 and isinstance(sentence, (And, Or)):
+            return operands[0]
+
+        self.num_vars += 1
+        a = self.num_vars
+        if isinstance(sentence, And):
+            self.clauses.extend([-a, x] for x in operands)
+            self.clauses.append([a] + [-x for x in operands])
+        elif isinstance(sentence, Or):
+            self.clauses.extend([a, -x] for x in operands)
+            self.clauses.append([-a] + operands)
+        elif isinstance(sentence, Implication):
+            x, y = operands
+            self.clauses.extend([[-a, -x, y], [a, x], [a, -y]])
+        else:
+            x, y = operands
+            self.clauses.extend([
+                [-a, -x, y], [-a, x, -y], [a, x, y], [a, -x, -y]
+            ])
+        self.literals[sentence] = a
+        return a
+
+    def renumber(self, numbering, offset):
+        """
+        Return the clauses and root literal with each symbol renumbered by
+        `numbering` (from symbol name to variable) and the new variables
+        numbered from `offset` + 1, for combining sentences in one solver.
+        """
+        mapping = [0] + [numbering[symbol] for symbol in self.symbols]
+        mapping.extend(range(offset + 1, offset + self.auxiliaries() + 1))
+
+        def literal(x):
+            return mapping[x] if x > 0 else -mapping[-x]
+
+        clauses = [[literal(x) for x in clause] for clause in self.clauses]
+        return clauses, literal(self.root)
+
+    def auxiliaries(self):
+        """Return the number of variables that are not symbols."""
+        return self.num_vars - len(self.symbols)
+
+
+def cnf(sentence):
+    """
+    Return the CNF compilation of `sentence`, compiling it only the first
+    time unless the sentence or the caches have since been changed.
+    """
+    key = (hash(sentence), Sentence.generation)
+    cached = getattr(sentence, "cnf_cache", None)
+    if cached is None or cached[0] != key:
+        cached = (key, CNF(sentence))
+        sentence.cnf_cache = cached
+    return cached[1]
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, by checking with a SAT solver
+    that knowledge base and the negation of query cannot both be true.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    numbering = {symbol: n for n, symbol in enumerate(symbols, 1)}
+    solver = Solver()
+    offset = len(symbols)
+    for sentence, polarity in ((knowledge, 1), (query, -1)):
+        compiled = cnf(sentence)
+        clauses, root = compiled.renumber(numbering, offset)
+        offset += compiled.auxiliaries()
+        for clause in clauses:
+            solver.add_clause(clause)
+        solver.add_clause([polarity * root])
+    return not solver.solve()
+
+
+def symbol_order(sentence):
+    """
+    Returns the symbols of `sentence` in the order a depth-first traversal
+    first reaches them, which keeps symbols that appear together in
+    subsentences close together in a decision diagram.
+    """
+    order = dict()
+    stack = [sentence]
+    seen = set()
+    while stack:
+        sentence = stack.pop()
+        if sentence in seen:
+            continue
+        seen.add(sentence)
+        if isinstance(sentence, Symbol):
+            order.setdefault(sentence.name, len(order))
+        else:
+            stack.extend(reversed(list(sentence.operands())))
+    return list(order)
+
+
+class OBDD():
+
+    def __init__(self, knowledge, order=None):
+        """
+        Compile knowledge base into a reduced ordered binary decision
+        diagram, testing symbols in `order` (by default `symbol_order`).
+        Entailment of literals, model counting and conditioning on evidence
+        then take time linear in the size of the diagram.
+        """
+        self.symbols = list(order or symbol_order(knowledge))
+        self.levels = {symbol: n for n, symbol in enumerate(self.symbols)}
+        self.bdd = BDD(len(self.symbols))
+        self.nodes = dict()
+        self.root = self.build(knowledge)
+
+    def build(self, sentence):
+        """Return the diagram node for `sentence`."""
+        node = self.nodes.get(sentence)
+        if node is not None:
+            return node
+        bdd = self.bdd
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.levels:
+                self.levels[sentence.name] = bdd.add_var()
+            node = bdd.variable(self.levels[sentence.name])
+        elif isinstance(sentence, Not):
+            node = bdd.negate(self.build(sentence.operand))
+        elif isinstance(sentence, And):
+            node = BDD.TRUE
+            for conjunct in sentence.conjuncts:
+                node = bdd.conjoin(node, self.build(conjunct))
+        elif isinstance(sentence, Or):
+            node = BDD.FALSE
+            for disjunct in sentence.disjuncts:
+                node = bdd.disjoin(node, self.build(disjunct))
+        elif isinstance(sentence, Implication):
+            node = bdd.implies(self.build(sentence.antecedent),
+                               self.build(sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            node = bdd.equivalent(self.build(sentence.left),
+                                  self.build(sentence.right))
+        else:
+            raise TypeError("must be a logical sentence")
+        self.nodes[sentence] = node
+        return node
+
+    def assignment(self, evidence):
+        """Map evidence, from symbol name to True or False, to levels."""
+        return {self.levels[name]: bool(value) for name, value in evidence.items()}
+
+    def entails(self, query):
+        """Checks if knowledge base entails query."""
+        if isinstance(query, Symbol) and query.name in self.levels:
+            evidence = {query.name: False}
+        elif (isinstance(query, Not) and isinstance(query.operand, Symbol)
+                and query.operand.name in self.levels):
+            evidence = {query.operand.name: True}
+        else:
+            return self.bdd.implies(self.root, self.build(query)) == BDD.TRUE
+        return self.bdd.restrict(self.root, self.assignment(evidence)) == BDD.FALSE
+
+    def count(self, evidence=None):
+        """
+        Returns the number of models of knowledge base, over its symbols,
+        that agree with `evidence` (from symbol name to True or False).
+        """
+        evidence = evidence or dict()
+        root = self.condition(evidence)
+        return self.bdd.count(root, len(self.symbols)) >> len(evidence)
+
+    def condition(self, evidence):
+        """
+        Returns the node for knowledge base with the symbols in `evidence`
+        fixed to their values.
+        """
+        return self.bdd.restrict(self.root, self.assignment(evidence))
+
+
+# Most compiled knowledge bases kept by `obdd`
+OBDD_CACHE_SIZE = 64
+OBDD_CACHE = OrderedDict()
+
+
+def obdd(knowledge):
+    """
+    Returns the decision diagram for knowledge base, reusing the diagram
+    of a structurally identical knowledge base compiled recently.
+    """
+    key = (hash(knowledge), knowledge)
+    compiled = OBDD_CACHE.get(key)
+    if compiled is None:
+        compiled = OBDD_CACHE[key] = OBDD(knowledge)
+        if len(OBDD_CACHE) > OBDD_CACHE_SIZE:
+            OBDD_CACHE.popitem(last=False)
+    else:
+        OBDD_CACHE.move_to_end(key)
+    return compiled
+
+
+def clear_caches():
+    """
+    Forget compiled knowledge bases and CNF compilations, so that engines
+    can be timed from scratch.
+    """
+    OBDD_CACHE.clear()
+    for sentence in list(Sentence.interned.values()):
+        sentence.cnf_cache = None
+    Sentence.generation += 1
+
+
+def obdd_check(knowledge, query):
+    """Checks if knowledge base entails query, using its decision diagram."""
+    return obdd(knowledge).entails(query)
+
+
+def obdd_entail(knowledge, queries):
+    """
+    Returns the queries that knowledge base entails, compiling knowledge
+    base into a decision diagram once.
+    """
+    compiled = obdd(knowledge)
+    return [query for query in queries if compiled.entails(query)]
+
+
+def model_check_entail(knowledge, queries):
+    """
+    Returns the queries that knowledge base entails, by enumerating every
+    model once, dropping each query at the first model of knowledge base
+    where it is false.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), *[
+        query.symbols() for query in queries
+    ]))
+    remaining = list(queries)
+    for values in itertools.product([True, False], repeat=len(symbols)):
+        if not remaining:
+            break
+        model = dict(zip(symbols, values))
+        if knowledge.evaluate(model):
+            remaining = [query for query in remaining if query.evaluate(model)]
+    entailed = set(remaining)
+    return [query for query in queries if query in entailed]
+
+
+def models_entail(knowledge, queries):
+    """
+    Returns the queries that knowledge base entails, by running compiled
+    evaluators for all of them on every bit-packed model, dropping each
+    query at the first model of knowledge base where it is false.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), *[
+        query.symbols() for query in queries
+    ]))
+    kb = compile_sentence(knowledge, symbols)
+    remaining = [(query, compile_sentence(query, symbols)) for query in queries]
+    for model in range(2 ** len(symbols)):
+        if not remaining:
+            break
+        if kb(model):
+            remaining = [(query, check) for query, check in remaining
+                         if check(model)]
+    entailed = {query for query, _ in remaining}
+    return [query for query in queries if query in entailed]
+
+
+def vectors_entail(knowledge, queries):
+    """
+    Returns the queries that knowledge base entails, evaluating compiled
+    sentences on NumPy vectors of VECTOR_SIZE models at a time.
+    """
+    import numpy as np
+
+    symbols = sorted(set.union(knowledge.symbols(), *[
+        query.symbols() for query in queries
+    ]))
+    if len(symbols) >= 64:
+        raise ValueError("too many symbols to pack into 64-bit models")
+    kb = compile_sentence(knowledge, symbols)
+    remaining = [(query, compile_sentence(query, symbols)) for query in queries]
+    total = 2 ** len(symbols)
+    for start in range(0, total, VECTOR_SIZE):
+        if not remaining:
+            break
+        models = np.arange(start, min(start + VECTOR_SIZE, total), dtype=np.uint64)
+        models = models[kb(models) == 1]
+        remaining = [(query, check) for query, check in remaining
+                     if np.all(check(models))]
+    entailed = {query for query, _ in remaining}
+    return [query for query in queries if query in entailed]
+
+
+def solver_entails(knowledge, queries):
+    """
+    Returns the queries that knowledge base entails, using one SAT solver
+    for all of them: a query is entailed if knowledge base is unsatisfiable
+    under the assumption that the query is false, and every model found
+    along the way rules out the queries that are false in it.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), *[
+        query.symbols() for query in queries
+    ]))
+    numbering = {symbol: n for n, symbol in enumerate(symbols, 1)}
+    solver = Solver()
+    offset = len(symbols)
+    roots = []
+    for sentence in [knowledge] + list(queries):
+        compiled = cnf(sentence)
+        clauses, root = compiled.renumber(numbering, offset)
+        offset += compiled.auxiliaries()
+        for clause in clauses:
+            solver.add_clause(clause)
+        roots.append(root)
+    solver.new_var(offset)
+    kb, roots = roots[0], roots[1:]
+    if not solver.add_clause([kb]) or not solver.solve():
+        return list(queries)
+
+    def holds(root):
+        return solver.model[abs(root)] == (root > 0)
+
+    candidates = [root for root in roots if holds(root)]
+    entailed = set()
+    for root in candidates:
+        if root in entailed or not holds(root):
+            continue
+        if solver.solve([-root]):
+            continue
+        entailed.add(root)
+        solver.add_clause([root])
+    return [query for query, root in zip(queries, roots) if root in entailed]
+
+
+def entailed(knowledge, queries, engine="cdcl"):
+    """
+    Returns the queries, in order, that knowledge base entails. Engines in
+    QUERY_ENGINES answer all of them from one enumeration or one solver;
+    any other engine in ENGINES checks them one at a time.
+    """
+    queries = list(queries)
+    if engine in QUERY_ENGINES:
+        return QUERY_ENGINES[engine](knowledge, queries)
+    return [query for query in queries if ENGINES[engine](knowledge, query)]
+
+
+def backbone(knowledge, engine="cdcl"):
+    """
+    Returns the literals, as symbols or negated symbols, that are true in
+    every model of knowledge base.
+    """
+    literals = []
+    for name in sorted(knowledge.symbols()):
+        literals.extend([Symbol(name), Not(Symbol(name))])
+    return entailed(knowledge, literals, engine)
+
+
+# Ways to check entailment, by name
+ENGINES = {
+    "model_check": model_check,
+    "compiled": compiled_check,
+    "vectorized": vectorized_check,
+    "parallel": parallel_check,
+    "cdcl": entails,
+    "obdd": obdd_check
+}
+
+# Engines that answer many queries about one knowledge base at once
+QUERY_ENGINES = {
+    "model_check": model_check_entail,
+    "compiled": models_entail,
+    "vectorized": vectors_entail,
+    "cdcl": solver_entails,
+    "obdd": obdd_entail
+}
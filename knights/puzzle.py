@@ -1,3 +1,5 @@
+import sys
+
 from logic import *
 
 AKnight = Symbol("A is a Knight")
@@ -88,6 +90,10 @@ knowledge3 = And(
 
 
 def main():
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] not in ENGINES):
+        sys.exit(f"Usage: python puzzle.py [{' | '.join(ENGINES)}]")
+    engine = sys.argv[1] if len(sys.argv) == 2 else "model_check"
+
     symbols = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
     puzzles = [
         ("Puzzle 0", knowledge0),
@@ -100,9 +106,12 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
-                    print(f"    {symbol}")
+            try:
+                answers = entailed(knowledge, symbols, engine)
+            except ImportError as e:
+                sys.exit(f"Cannot use {engine} engine: {e}")
+            for symbol in answers:
+                print(f"    {symbol}")
 
 
 if __name__ == "__main__":
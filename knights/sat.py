@@ -0,0 +1,291 @@
+import heapq
+
+
+class Solver():
+
+    # Conflicts before the first restart; later restarts follow the
+    # Luby sequence in multiples of this
+    RESTART_BASE = 100
+
+    # Factor by which variable activities decay after each conflict
+    ACTIVITY_DECAY = 0.95
+
+    def __init__(self, clauses=()):
+        """
+        Create a CDCL SAT solver over variables numbered from 1, with
+        literals written as in DIMACS: v for variable v being true, -v for
+        it being false. Clauses are lists of literals.
+        """
+        self.num_vars = 0
+        self.ok = True
+
+        # Value, decision level and implying clause of each variable
+        self.assigns = [None]
+        self.level = [0]
+        self.reason = [None]
+
+        # Assigned literals in order, and where each decision level starts
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+
+        # Clauses watching each literal, which are visited when it is false
+        self.watches = dict()
+
+        # Branching heuristic: variable activity and last polarity
+        self.activity = [0.0]
+        self.var_inc = 1.0
+        self.polarity = [False]
+        self.heap = []
+
+        self.model = dict()
+        self.stats = {"decisions": 0, "propagations": 0, "conflicts": 0, "restarts": 0}
+
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def new_var(self, v):
+        """Make sure variables up to `v` exist."""
+        while self.num_vars < v:
+            self.num_vars += 1
+            self.assigns.append(None)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.polarity.append(False)
+            self.watches[self.num_vars] = []
+            self.watches[-self.num_vars] = []
+            heapq.heappush(self.heap, (0.0, self.num_vars))
+
+    def value(self, literal):
+        """Return True, False or None (unassigned) for `literal`."""
+        value = self.assigns[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def add_clause(self, clause):
+        """
+        Add a clause to the solver. Return False if the clauses added so far
+        are unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+
+        literals = []
+        for literal in clause:
+            self.new_var(abs(literal))
+            value = self.value(literal)
+            if value is True or -literal in literals:
+                return True  # satisfied or tautology
+            if value is None and literal not in literals:
+                literals.append(literal)
+
+        if not literals:
+            self.ok = False
+        elif len(literals) == 1:
+            self.enqueue(literals[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(literals)
+        return self.ok
+
+    def attach(self, clause):
+        """Watch the first two literals of `clause`."""
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def enqueue(self, literal, reason):
+        """Make `literal` true, as implied by clause `reason` (or decided)."""
+        v = abs(literal)
+        self.assigns[v] = literal > 0
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Perform unit propagation. Return a conflicting clause, or None.
+        Clauses keep their two watched literals first, and a clause that
+        implies a literal keeps it in first place.
+        """
+        while self.qhead < len(self.trail):
+            false_literal = -self.trail[self.qhead]
+            self.qhead += 1
+            self.stats["propagations"] += 1
+            watchers = self.watches[false_literal]
+            self.watches[false_literal] = kept = []
+
+            for i, clause in enumerate(watchers):
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) is True:
+                    kept.append(clause)
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(clause[0]) is False:
+                        kept.extend(watchers[i + 1:])
+                        return clause
+                    self.enqueue(clause[0], clause)
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derive a clause from `conflict` with a single literal at the current
+        decision level (the first unique implication point). Return the
+        clause, with that literal first, and the level to backjump to.
+        """
+        learnt = [None]
+        seen = set()
+        counter = 0
+        literal = None
+        clause = conflict
+        index = len(self.trail) - 1
+        current = len(self.trail_lim)
+
+        while True:
+            for q in (clause if literal is None else clause[1:]):
+                v = abs(q)
+                if v not in seen and self.level[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.level[v] == current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+
+            # Walk back along the trail to the next literal involved
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            clause = self.reason[abs(literal)]
+            counter -= 1
+            if counter == 0:
+                break
+
+        learnt[0] = -literal
+        if len(learnt) == 1:
+            return learnt, 0
+
+        # Watch the literal from the highest remaining level second
+        k = max(range(1, len(learnt)), key=lambda i: self.level[abs(learnt[i])])
+        learnt[1], learnt[k] = learnt[k], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def bump(self, v):
+        """Increase the activity of variable `v`."""
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.var_inc *= 1e-100
+            self.heap = [(-self.activity[u], u) for _, u in self.heap]
+            heapq.heapify(self.heap)
+        heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def cancel_until(self, level):
+        """Undo all assignments above decision level `level`."""
+        if len(self.trail_lim) <= level:
+            return
+        for literal in self.trail[self.trail_lim[level]:]:
+            v = abs(literal)
+            self.polarity[v] = literal > 0
+            self.assigns[v] = None
+            self.reason[v] = None
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[self.trail_lim[level]:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def pick_branch(self):
+        """Return the unassigned variable with the highest activity, or None."""
+        while self.heap:
+            _, v = heapq.heappop(self.heap)
+            if self.assigns[v] is None:
+                return v
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Return True if the clauses are satisfiable with every literal in
+        `assumptions` true, storing a satisfying assignment in `model`;
+        return False otherwise.
+        """
+        if not self.ok:
+            return False
+        for literal in assumptions:
+            self.new_var(abs(literal))
+        self.cancel_until(0)
+
+        restarts = 0
+        budget = self.RESTART_BASE * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.stats["conflicts"] += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learnt, level = self.analyze(conflict)
+                self.cancel_until(level)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.attach(learnt)
+                    self.enqueue(learnt[0], learnt)
+                self.var_inc /= self.ACTIVITY_DECAY
+
+                budget -= 1
+                if budget == 0:
+                    self.stats["restarts"] += 1
+                    restarts += 1
+                    budget = self.RESTART_BASE * luby(restarts)
+                    self.cancel_until(0)
+                continue
+
+            # Decide assumptions first, in order, then the busiest variable
+            decision = None
+            for literal in assumptions:
+                value = self.value(literal)
+                if value is False:
+                    self.cancel_until(0)
+                    return False
+                if value is None:
+                    decision = literal
+                    break
+            if decision is None:
+                v = self.pick_branch()
+                if v is None:
+                    self.model = {
+                        v: bool(self.assigns[v])
+                        for v in range(1, self.num_vars + 1)
+                    }
+                    self.cancel_until(0)
+                    return True
+                decision = v if self.polarity[v] else -v
+
+            self.stats["decisions"] += 1
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(decision, None)
+
+
+def luby(i):
+    """Return the `i`th term (from 0) of the Luby sequence 1 1 2 1 1 2 4 ..."""
+    size, exponent = 1, 0
+    while size < i + 1:
+        exponent += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        exponent -= 1
+        i %= size
+    return 1 << exponent